@@ -23,7 +23,6 @@ with this program. If not, see https://www.gnu.org/licenses/
 from abc import ABCMeta
 from dataclasses import dataclass
 import enum
-from functools import cached_property
 
 import yaml
 
@@ -32,6 +31,8 @@ from core import config, time, typing as T
 
 class _YAMLConfig(config.base.Config, metaclass=ABCMeta):
     """ Abstract base class for building configuration from YAML """
+    __slots__ = ()
+
     @staticmethod
     def _build(*sources: T.Path) -> T.Dict[T.Any, T.Any]:
         _config: T.Dict[T.Any, T.Any] = {}
@@ -199,14 +200,21 @@ def _validate(data: T.Dict, schema: T.Dict) -> bool:
 
 
 class Config(_YAMLConfig):
+    __slots__ = ("_executables", "_valid")
 
     def __init__(self, *sources: T.Any, executables: T.Set[Executable]):
         self._executables = executables
+        self._valid: T.Optional[bool] = None
         super().__init__(*sources)
 
-    @cached_property
+    @property
     def _is_valid(self):
-        return all(_validate(self._contents, _schema[executable]) for executable in self._executables)
+        # NOTE Validation casts the contents in-place, so it can only be
+        # run once; its result is memoised
+        if self._valid is None:
+            self._valid = all(_validate(self._contents, _schema[executable]) for executable in self._executables)
+
+        return self._valid
 
     @property
     def _extra_attr(self):
@@ -31,6 +31,10 @@ from .ldap import LDAP, NoResultsFound
 
 class _LazyLDAPIdentity(metaclass=ABCMeta):
     """ Abstract base class for lazy LDAP identity loading """
+    # NOTE The concrete identity classes hold the slots, to avoid an
+    # instance layout conflict with the identity base classes
+    __slots__ = ()
+
     _idm: LDAPIdentityManager
     _exc: T.ClassVar[Template]
 
@@ -64,10 +68,15 @@ class _LazyLDAPIdentity(metaclass=ABCMeta):
 
 
 class LDAPUser(_LazyLDAPIdentity, idm.base.User):
+    __slots__ = ("_idm", "_name", "_email")
     _exc = Template("User with POSIX ID $identity was not found")
 
-    _name: T.Optional[str] = None
-    _email: T.Optional[str] = None
+    _name: T.Optional[str]
+    _email: T.Optional[str]
+
+    def __init__(self, ldap_idm: LDAPIdentityManager, identity: int) -> None:
+        super().__init__(ldap_idm, identity)
+        self._name = self._email = None
 
     @classmethod
     def from_dn(cls, ldap_idm: LDAPIdentityManager, dn: str) -> LDAPUser:
@@ -130,11 +139,16 @@ class LDAPUser(_LazyLDAPIdentity, idm.base.User):
 
 
 class LDAPGroup(_LazyLDAPIdentity, idm.base.Group):
+    __slots__ = ("_idm", "_name", "_owners", "_members")
     _exc = Template("Group with POSIX ID $identity was not found")
 
-    _name: T.Optional[str] = None
-    _owners: T.Optional[T.List[LDAPUser]] = None
-    _members: T.Optional[T.List[LDAPUser]] = None
+    _name: T.Optional[str]
+    _owners: T.Optional[T.List[LDAPUser]]
+    _members: T.Optional[T.List[LDAPUser]]
+
+    def __init__(self, ldap_idm: LDAPIdentityManager, identity: int) -> None:
+        super().__init__(ldap_idm, identity)
+        self._name = self._owners = self._members = None
 
     @classmethod
     def from_dn(cls, ldap_idm: LDAPIdentityManager, dn: str) -> LDAPGroup:
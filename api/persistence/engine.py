@@ -83,14 +83,15 @@ class Persistence(persistence.base.Persistence, Loggable):
             # Don't refresh groups that are known to the session
             return
 
-        log.debug(f"Persisting group {gid}")
+        log.debug("Persisting group %s", gid)
         t.execute("""
             insert into groups (gid) values (%s)
             on conflict do nothing;
         """, (gid,))
 
         for user in group.owners:
-            log.debug(f"Recording user {user.uid} as an owner of group {gid}")
+            log.debug("Recording user %s as an owner of group %s",
+                      user.uid, gid)
             t.execute("""
                 insert into group_owners (gid, owner) values (%s, %s)
                 on conflict do nothing;
@@ -119,20 +120,21 @@ class Persistence(persistence.base.Persistence, Loggable):
             known = File.FromDBQuery(t, file, self._idm)
             if known is not None and file != known:
                 # Delete known file if it differs
-                log.debug(f"Deleting records for file {file_id}")
+                log.debug("Deleting records for file %s", file_id)
                 known = known.purge(t)
 
             if known is None or known.key != file.key:
                 # Insert/update the file record, if necessary
-                message = f"Persisting file {file_id}" if known is None \
-                          else f"Updating persisted key for {file_id}"
+                message = "Persisting file %s" if known is None \
+                          else "Updating persisted key for %s"
 
-                log.debug(message)
+                log.debug(message, file_id)
                 known = file.persist(t)
 
             if state.exists(t, known) is None:
                 # Set state, if not already
-                log.debug(f"Setting {state.db_type} status for file {file_id}")
+                log.debug("Setting %s status for file %s",
+                          state.db_type, file_id)
                 state.persist(t, known)
 
     @property
@@ -192,9 +194,7 @@ class Persistence(persistence.base.Persistence, Loggable):
             t.execute(*Persistence.states_sql(criteria))
 
             for record in t:
-                self.log.debug(
-                    f"Adding {record} to collection"
-                )
+                self.log.debug("Adding %s to collection", record)
                 collection += State.Warned.FromDBRecord(record)
 
         return collection
@@ -230,8 +230,8 @@ class Persistence(persistence.base.Persistence, Loggable):
             """, params)
 
             for record in t:
-                self.log.debug(
-                    f"Adding {record.device}:{record.inode} to collection")
+                self.log.debug("Adding %s:%s to collection",
+                               record.device, record.inode)
                 collection += File.FromDBRecord(record, self._idm)
 
         return collection
@@ -21,6 +21,7 @@ You should have received a copy of the GNU General Public License along
 with this program. If not, see https://www.gnu.org/licenses/
 """
 
+import errno
 import fnmatch
 import os
 import stat
@@ -32,6 +33,9 @@ from .key import VaultFileKey
 
 VaultExc = core.vault.exception
 
+# Error numbers from stat that mean a path doesn't (usably) exist
+_NONEXISTENT = frozenset((errno.ENOENT, errno.ENOTDIR, errno.EBADF, errno.ELOOP))
+
 
 class VaultFile(core.vault.base.VaultFile):
     """ HGI vault file implementation """
@@ -44,15 +48,23 @@ class VaultFile(core.vault.base.VaultFile):
         log = vault.log
         path = path.resolve()
 
-        if not path.exists():
+        # NOTE The resolved path can't be a symlink, so a single stat
+        # tells us whether it exists, is a regular file and its inode
+        try:
+            path_stat = path.stat()
+        except OSError as e:
+            # NOTE These are the errors Path.exists treats as absence
+            if e.errno not in _NONEXISTENT:
+                raise
+
             raise VaultExc.DoesNotExist(f"{path} does not exist")
 
-        if not file.is_regular(path):
+        if not stat.S_ISREG(path_stat.st_mode):
             raise VaultExc.NotRegularFile(f"{path} is not a regular file")
 
         max_file_name_length: int = os.pathconf(path, "PC_NAME_MAX")
 
-        inode = file.inode_id(path)
+        inode = path_stat.st_ino
         path = self._relative_path(path)
         self._key = expected_key = VaultFileKey(
             path, inode, max_file_name_length)
@@ -109,19 +121,18 @@ class VaultFile(core.vault.base.VaultFile):
         IncorrectVault exception; if that path is physically within the
         vault, then raise a PhysicalVaultFile exception.
 
-        @param   path  Path
+        @param   path  Resolved path
         @return  Path relative to vault root
         """
-        path = path.resolve()
         root = self.vault.root
         vault = self.vault.location
 
-        try:
-            _ = path.relative_to(vault)
+        # NOTE Almost every path is outside the vault directory, so we
+        # check with a string prefix rather than have relative_to raise
+        if (spath := str(path)) == str(vault) \
+                or spath.startswith(os.path.join(vault, "")):
             raise VaultExc.PhysicalVaultFile(
                 f"{path} is physically contained in the vault in {root}")
-        except ValueError:
-            pass
 
         try:
             return path.relative_to(root)
@@ -144,10 +155,27 @@ class VaultFile(core.vault.base.VaultFile):
         if key_base is not None:
             search_base = search_base / key_base
 
+        # NOTE Keys are named by their inode's LSB directly under their
+        # inode prefix directory, so only the entries there can match;
+        # we descend into those alone (i.e., keys that are split over
+        # directories), rather than walking the whole subtree
         try:
-            alt_suffix, *others = (
-                T.Path(dirname, f) for dirname, _, subfiles in os.walk(search_base)
-                for f in subfiles if fnmatch.fnmatch(T.Path(dirname, f), key_glob)
+            with os.scandir(search_base) as entries:
+                candidates = [
+                    entry for entry in entries
+                    if fnmatch.fnmatch(entry.name, key_glob)
+                ]
+        except OSError:
+            # Alternate not found
+            return None
+
+        try:
+            alternate, *others = (
+                match.path
+                for candidate in candidates
+                for match in (file.walk(candidate.path)
+                              if candidate.is_dir(follow_symlinks=False)
+                              else (candidate,))
             )
         except ValueError:
             # Alternate not found
@@ -158,12 +186,8 @@ class VaultFile(core.vault.base.VaultFile):
             raise VaultExc.VaultCorruption(
                 f"The vault in {self.vault.root} contains duplicates of {key.path} in the {branch} branch")
 
-        alternate = T.Path(alt_suffix)
-        if key_base is not None:
-            alternate = key_base / alternate
-
         # The VFK must be relative to the branch
-        return VaultFileKey.Reconstruct(alternate.relative_to(branch_base))
+        return VaultFileKey.Reconstruct(T.Path(alternate).relative_to(branch_base))
 
     @property
     def path(self) -> T.Path:
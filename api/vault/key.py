@@ -88,7 +88,12 @@ class VaultFileKey(os.PathLike):
         @return  Reconstructed VaultFileKey
         """
         path, inode = cls._decode_key(key_path)
-        return cls(path, inode)
+        key = cls(path, inode)
+
+        # NOTE We've just decoded the source path, so we seed its cached
+        # property rather than have it decoded again on access
+        key.source = path
+        return key
 
     @classmethod
     def _decode_key(cls, key_path: T.Path) -> T.Tuple[T.Path, int]:
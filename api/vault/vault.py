@@ -125,11 +125,26 @@ class Vault(BaseHGIVault):
         return self.root.stat().st_gid
 
     @cached_property
-    def owners(self) -> T.Iterator[int]:
+    def _owner_ids(self) -> T.Tuple[int, ...]:
         if (group := self._idm.group(gid=self.group)) is None:
             raise IdMExc.NoSuchIdentity(f"No group found with ID {self.group}")
 
-        return (user.uid for user in group.owners)
+        return tuple(user.uid for user in group.owners)
+
+    @property
+    def owners(self) -> T.Iterator[int]:
+        # NOTE The owners are looked up once per vault, but a fresh
+        # iterator is returned every time, as a vault instance is shared
+        # by every file it's asked about
+        return iter(self._owner_ids)
+
+    def branch(self, path: T.Path) -> T.Optional[Branch]:
+        # NOTE Our VaultFile implementation searches every branch for
+        # the file's key and corrects its branch accordingly, so -- as
+        # opposed to the generic implementation -- we only need to
+        # construct it once, rather than once per branch
+        vault_file = self.file(Branch.Keep, path)
+        return vault_file.branch if vault_file.exists else None
 
     def add(self, branch: Branch, path: T.Path) -> VaultFile:
         log = self.log
@@ -185,14 +200,29 @@ class Vault(BaseHGIVault):
             log.info(f"{to_remove.source} is not in the vault in {self.root}")
 
     def list(self, branch: Branch) -> T.Iterator[T.Tuple[T.Path, T.Path]]:
+        return (
+            (source, T.Path(entry))
+            for source, entry in self.scan(branch)
+        )
+
+    def scan(self, branch: Branch) -> T.Iterator[T.Tuple[T.Path, os.DirEntry]]:
+        """
+        Return an iterator of files that exist in the given vault branch
+        by their extra-vault paths, along with their directory entries in
+        the vault, so their (cached) stat information can be used
+
+        @note    There is no guarantee on the order of the output
+
+        @param   branch  Branch
+        @return  Iterator of paths and directory entries
+        """
         # NOTE The order in which the listing is generated is
         # unspecified (I suspect it will be by inode ID); it is up to
         # downstream to modify this, as required
         bpath = self.location / branch
 
         return (
-            (self.root / VaultFileKey.Reconstruct(T.Path(dirname, file).relative_to(bpath)).source,
-             T.Path(dirname, file))
-            for dirname, _, files in os.walk(bpath)
-            for file in files
+            (self.root / VaultFileKey.Reconstruct(T.Path(entry).relative_to(bpath)).source,
+             entry)
+            for entry in file.walk(bpath)
         )
@@ -64,7 +64,8 @@ def main(argv: T.List[str] = sys.argv) -> None:
         if args.stats is not None:
             log.info(f"Walking mpistat output from {args.stats}")
             log.warning("mpistat data may not be up to date")
-            walker = mpistatWalker(args.stats, *args.vaults)
+            walker = mpistatWalker(args.stats, *args.vaults,
+                                   cache=args.stats_cache)
 
         else:
             log.info("Walking the filesystem directly")
@@ -263,17 +263,16 @@ class Sweeper(Loggable):
         special directories
         """
         log = self.log
-        log.debug(
-            f"{file.path} is physically contained within the vault in {vault.root}")
+        log.debug("%s is physically contained within the vault in %s",
+                  file.path, vault.root)
 
         # We only need to check for corruptions (i.e., single hardlink)
         # of files that physically exist in the keep or archive branches
+        path = str(file.path)
         for branch in Branch.Keep, Branch.Archive, Branch.Limbo:
             bpath = vault.location / branch
 
-            try:
-                _ = file.path.relative_to(bpath)
-            except ValueError:
+            if not path.startswith(f"{bpath}/"):
                 # File is not in the current branch
                 continue
 
@@ -341,8 +340,8 @@ class Sweeper(Loggable):
         staging, the original source file is hard-deleted
         """
         log = self.log
-        log.debug(
-            f"{file.path} is in the {status} branch of the vault in {vault.root}")
+        log.debug("%s is in the %s branch of the vault in %s",
+                  file.path, status, vault.root)
 
         if status in [Branch.Stash, Branch.Archive]:
             if file.locked:
@@ -386,7 +385,7 @@ class Sweeper(Loggable):
         their ages exceed warning thresholds
         """
         log = self.log
-        log.debug(f"{file.path} is untracked")
+        log.debug("%s is untracked", file.path)
 
         try:
             if not VaultFile(vault, Branch.Limbo, file.path).can_add:
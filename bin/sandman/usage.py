@@ -44,6 +44,9 @@ def _parser_factory():
     top_level.add_argument("--stats", metavar="FILE", type=T.Path,
                            help="file listings generated by mpistat")
 
+    top_level.add_argument("--stats-cache", metavar="DIR", type=T.Path,
+                           help="directory in which to cache relevant mpistat records between runs, keeping only the latest for each set of vaults (requires --stats)")
+
     top_level.add_argument("--version", action="version",
                            version=f"%(prog)s {version.sandman}")
 
@@ -53,6 +56,9 @@ def _parser_factory():
         if parsed.force_drain and not parsed.archive:
             top_level.error("--force-drain can only be used with --archive")
 
+        if parsed.stats_cache is not None and parsed.stats is None:
+            top_level.error("--stats-cache can only be used with --stats")
+
         if parsed.stats is not None:
             parsed.stats = parsed.stats.resolve()
 
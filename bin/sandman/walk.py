@@ -23,10 +23,19 @@ from __future__ import annotations
 
 import fcntl
 import gzip
+import hashlib
+import io
 import os
+import shutil
 import stat
+import subprocess
+import tempfile
 from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager, suppress
+from itertools import islice
+from operator import itemgetter
 from os.path import commonprefix
+from time import monotonic
 
 from api.config import Executable
 from api.logging import Loggable
@@ -56,19 +65,64 @@ class InvalidVaultBases(Exception):
     """ Raised when invalid Vault base directories are specified """
 
 
+class _Tick:
+    """ The current time, read from the clock at most once per period """
+    _period: float
+    _expires: float
+    _now: T.DateTime
+
+    def __init__(self, period: float = 1.0) -> None:
+        """
+        Constructor
+
+        @param  period  Period in seconds
+        """
+        self._period = period
+        self._expires = float("-inf")
+
+    def __call__(self) -> T.DateTime:
+        # NOTE The monotonic clock is much cheaper to read than building
+        # a timezone-aware datetime, so we only do the latter as needed
+        if (elapsed := monotonic()) >= self._expires:
+            self._now = time.now()
+            self._expires = elapsed + self._period
+
+        return self._now
+
+
+# The time, to within a second, for age and staleness checks
+_now = _Tick()
+
+
 class File(file.BaseFile):
     """ Walked file model (wrapper around persistence file model) """
+    # NOTE There can be many millions of these in a walk, so we avoid
+    # the memory and allocation overhead of a per-instance __dict__
+    __slots__ = ("_file", "_timestamp", "_fresh_until", "_idm")
+
     _file: models.File
     _timestamp: T.DateTime
+    _fresh_until: float
+    _idm: IDMBase.IdentityManager
 
     def __init__(self, file: models.File,
                  timestamp: T.Optional[T.DateTime] = None,
                  idm: IDMBase.IdentityManager = idm) -> None:
         """ Construct from filesystem """
         self._file = file
-        self._timestamp = timestamp or time.now()
         self._idm = idm
 
+        if timestamp is None:
+            # Freshly stat'd files can't be stale until the restat period
+            # has elapsed, which we can check against the monotonic clock
+            self._timestamp = _now()
+            self._fresh_until = monotonic() + _RESTAT_AFTER.total_seconds()
+
+        else:
+            # Defer working out when explicitly timestamped files go stale
+            self._timestamp = timestamp
+            self._fresh_until = float("-inf")
+
     @classmethod
     def FromFS(cls, path: T.Path, idm: IDMBase.IdentityManager = idm) -> File:
         """ Construct from filesystem """
@@ -76,7 +130,8 @@ class File(file.BaseFile):
 
     @classmethod
     def FromStat(cls, path: T.Path, stat: os.stat_result,
-                 timestamp: T.DateTime) -> File:
+                 timestamp: T.Optional[T.DateTime],
+                 idm: IDMBase.IdentityManager = idm) -> File:
         """ Construct from explicit stat data """
         file = models.File(device=stat.st_dev,
                            inode=stat.st_ino,
@@ -89,7 +144,25 @@ class File(file.BaseFile):
                            group=idm.group(gid=stat.st_gid),
                            size=stat.st_size)
 
-        return cls(file, timestamp)
+        return cls(file, timestamp, idm)
+
+    @classmethod
+    def FromDirEntry(cls, entry: os.DirEntry,
+                     idm: IDMBase.IdentityManager = idm, *,
+                     path: T.Optional[T.Path] = None) -> File:
+        """
+        Construct from a directory entry's (cached) stat data
+
+        @param   entry  Directory entry
+        @param   idm    Identity manager
+        @param   path   Full path of the entry (defaults to entry.path,
+                        which is just its name when the directory was
+                        scanned by file descriptor)
+        @return  Walked file
+        """
+        return cls.FromStat(path or T.Path(entry.path),
+                            entry.stat(follow_symlinks=False),
+                            None, idm)
 
     def __str__(self) -> str:
         return str(self.path)
@@ -101,8 +174,8 @@ class File(file.BaseFile):
     @property
     def age(self) -> T.TimeDelta:
         self.restat()
-        return time.now() - max([self._file.mtime,
-                                 self._file.atime, self._file.ctime])
+        return _now() - max([self._file.mtime,
+                             self._file.atime, self._file.ctime])
 
     @property
     def locked(self) -> bool:
@@ -122,14 +195,23 @@ class File(file.BaseFile):
 
     def restat(self, *, force: bool = False) -> None:
         """ Forcibly restat the file if it's stale """
+        # NOTE A single float comparison against the monotonic clock
+        # saves the datetime arithmetic when we know the file is fresh
+        if not force and monotonic() < self._fresh_until:
+            return
+
         # NOTE We backup and restore the key value because it's set to
         # None in the constructor with no way to override it
-        if force or time.now() - self._timestamp > _RESTAT_AFTER:
+        if force or (age := _now() - self._timestamp) > _RESTAT_AFTER:
             key = self._file.key
             self._file = models.File.FromFS(self.path, self._idm)
             self._file.key = key
 
             self._timestamp = time.now()
+            self._fresh_until = monotonic() + _RESTAT_AFTER.total_seconds()
+
+        else:
+            self._fresh_until = monotonic() + (_RESTAT_AFTER - age).total_seconds()
 
     def delete(self) -> None:
         """ Delete the file """
@@ -160,6 +242,23 @@ class BaseWalker(Loggable, metaclass=ABCMeta):
         @return  Generator of Vault, file and status tuples
         """
 
+    def file_batches(self, size: int = 1024) -> T.Iterator[
+            T.List[T.Tuple[Vault, File, _VaultStatusT]]]:
+        """
+        Walk the representation of a filesystem and generate the files
+        that are found in bounded batches, so that downstream consumers
+        can amortise their per-file overheads (e.g., bulk persistence)
+
+        @param   size  Maximum batch size
+        @return  Generator of lists of Vault, file and status tuples
+        """
+        if size < 1:
+            raise ValueError("Batch size must be positive")
+
+        files = self.files()
+        while batch := list(islice(files, size)):
+            yield batch
+
     @staticmethod
     def _fetch_vaults(*paths: T.Path,
                       idm: IDMBase.IdentityManager = idm) -> T.Set[Vault]:
@@ -241,27 +340,135 @@ class FilesystemWalker(BaseWalker):
 
     @staticmethod
     def _walk_tree(
-            path: T.Path, vault: Vault, idm: IDMBase.IdentityManager = idm) -> T.Iterator[T.Tuple[Vault, File, _VaultStatusT]]:
-        # Recursively walk the tree from the given path
-        for f in path.iterdir():
-            # NOTE Don't walk symlinked directories: if they're symlinks
-            # within the same root, we'll get to them eventually; if
-            # they're outside the root, things could go very wrong!
-            if (not f.is_symlink()) and f.is_dir() and os.access(f, os.X_OK):
-                yield from FilesystemWalker._walk_tree(f, vault)
-
-            # We only care about regular files
-            elif file.is_regular(f):
-                yield vault, \
-                    File.FromFS(f, idm=idm), \
-                    FilesystemWalker._vault_status(vault, f)
+            path: T.Path, vault: Vault, idm: IDMBase.IdentityManager = idm, *,
+            dir_fd: T.Optional[int] = None) -> T.Iterator[T.Tuple[Vault, File, _VaultStatusT]]:
+        # Recursively walk the tree from the given path (relative to
+        # its parent's file descriptor, if one is given)
+        # NOTE We scan each directory through its own file descriptor,
+        # so the kernel looks up its entries relative to it, rather than
+        # resolving every full path from the root. Moreover, os.scandir
+        # caches the file type from the directory listing, and the stat
+        # data on first request, so each entry only goes back to the
+        # kernel (at most) once
+        fd = os.open(path if dir_fd is None else path.name,
+                     os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW,
+                     dir_fd=dir_fd)
+
+        try:
+            with os.scandir(fd) as entries:
+                for entry in entries:
+                    # NOTE Don't walk symlinked directories: if they're
+                    # symlinks within the same root, we'll get to them
+                    # eventually; if they're outside the root, things
+                    # could go very wrong!
+                    if entry.is_dir(follow_symlinks=False) \
+                       and os.access(entry.name, os.X_OK, dir_fd=fd):
+                        yield from FilesystemWalker._walk_tree(path / entry.name, vault, idm, dir_fd=fd)
+
+                    # We only care about regular files
+                    elif entry.is_file(follow_symlinks=False):
+                        walked = File.FromDirEntry(
+                            entry, idm, path=path / entry.name)
+                        yield vault, \
+                            walked, \
+                            FilesystemWalker._vault_status(vault, walked.path)
+
+        finally:
+            os.close(fd)
 
     def files(self) -> T.Iterator[T.Tuple[Vault, File, _VaultStatusT]]:
         for vault in self._vaults:
             yield from FilesystemWalker._walk_tree(vault.root, vault, idm=self._idm)
 
 
-# mpistat field indices
+class _PrefixTree(T.Generic[T.AnyStr]):
+    """ Path-compressed prefix tree of base64 encoded vault roots """
+    _stem: T.AnyStr
+    _vault: T.Optional[Vault]
+    _children: T.Dict[T.AnyStr, _PrefixTree[T.AnyStr]]
+
+    def __init__(self, prefixes: T.Dict[T.AnyStr, Vault]) -> None:
+        """
+        Construct the tree from the given prefixes
+
+        @param  prefixes  Mapping of prefixes to their respective vault
+        """
+        self._stem = stem = commonprefix(list(prefixes))
+        self._vault = prefixes.get(stem)
+
+        # Group the remaining prefixes by the character that follows
+        # the common stem, then recurse
+        # NOTE We slice, rather than index, so this works for bytes
+        branches: T.Dict[T.AnyStr, T.Dict[T.AnyStr, Vault]] = {}
+        for prefix, vault in prefixes.items():
+            if prefix != stem:
+                remainder = prefix[len(stem):]
+                branches.setdefault(remainder[:1], {})[remainder] = vault
+
+        self._children = {
+            char: _PrefixTree(branch)
+            for char, branch in branches.items()
+        }
+
+    def match(self, encoded: T.AnyStr) -> T.List[Vault]:
+        """
+        Return the vaults whose prefixes match the given string, from
+        the longest matching prefix to the shortest
+
+        @param   encoded  base64 encoded path
+        @return  List of matching vaults
+        """
+        matches = []
+        node, offset = self, 0
+
+        while node is not None and encoded.startswith(node._stem, offset):
+            offset += len(node._stem)
+            if node._vault is not None:
+                matches.append(node._vault)
+
+            node = node._children.get(encoded[offset:offset + 1])
+
+        matches.reverse()
+        return matches
+
+
+# Read buffer size, in bytes, for mpistat records
+_MPISTAT_BUFFER = 1 << 20
+
+# Number of fields in an mpistat record
+_MPISTAT_FIELDS = 11
+
+# The mode field of a regular file's mpistat record, with its delimiters
+_REGULAR_FILE = b"\tf\t"
+
+
+@contextmanager
+def _decompress(path: T.Path) -> T.Iterator[T.BinaryIO]:
+    """
+    Buffered stream of the decompressed contents of a gzip file; via
+    pigz in a separate process, if it's available, so inflation doesn't
+    compete with parsing, otherwise in-process
+
+    @param   path  Path to gzip file
+    @return  Context managed binary stream
+    """
+    if (pigz := shutil.which("pigz")) is None:
+        with gzip.open(path, mode="rb") as gz, \
+             io.BufferedReader(gz, buffer_size=_MPISTAT_BUFFER) as stream:
+            yield stream
+
+        return
+
+    with subprocess.Popen([pigz, "--decompress", "--stdout", str(path)],
+                          stdout=subprocess.PIPE,
+                          bufsize=_MPISTAT_BUFFER) as decompressor:
+        yield decompressor.stdout
+
+    if decompressor.returncode != 0:
+        raise gzip.BadGzipFile(f"Could not decompress {path}")
+
+
+# mpistat field indices (after the encoded path)
 _SIZE = 0
 _OWNER = 1
 _GROUP = 2
@@ -273,15 +480,50 @@ _INODE = 7
 _NLINKS = 8
 _DEVICE = 9
 
+# The mpistat fields of an os.stat_result, after its mode, in order
+_stat_fields = itemgetter(
+    _INODE,   # inode ID
+    _DEVICE,  # Device ID
+    _NLINKS,  # Number of hardlinks
+    _OWNER,   # Owner ID
+    _GROUP,   # Group ID
+    _SIZE,    # Size
+    _ATIME,   # Last accessed time
+    _MTIME,   # Last modified time
+    _CTIME    # Last changed time
+)
+
+
+def _digest(*parts: T.Any) -> str:
+    """
+    Digest of the string representations of the given values, used to
+    name cached mpistat records
+
+    @param   parts  Values to digest
+    @return  Hexadecimal SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(f"{part}\0".encode())
+
+    return digest.hexdigest()
+
 
 class mpistatWalker(BaseWalker):
     """ Walk an mpistat output file: Cheaper, but imprecise """
     _mpistat: T.Path
     _timestamp: T.DateTime
 
-    _vaults: T.Dict[str, Vault]
+    _vaults: T.Dict[bytes, Vault]
+    _prefixes: _PrefixTree[bytes]
+    _raw_prefixes: T.Tuple[bytes, ...]
+    _aligned: T.Dict[Vault, bytes]
+    _roots: T.Dict[Vault, str]
+    _cache: T.Optional[T.Path]
+    _cache_prefix: str
 
-    def __init__(self, mpistat: T.Path, *bases: T.Path) -> None:
+    def __init__(self, mpistat: T.Path, *bases: T.Path,
+                 cache: T.Optional[T.Path] = None) -> None:
         """
         Constructor: Set the base paths from which to start the walk.
         Note that any paths that are not directories, don't exist, or
@@ -289,6 +531,8 @@ class mpistatWalker(BaseWalker):
 
         @param  mpistat  mpistat output
         @param  bases    Base paths
+        @param  cache    Directory in which to cache the relevant mpistat
+                         records between walks (optional)
         """
         if not mpistat.is_file():
             raise FileNotFoundError(
@@ -296,7 +540,7 @@ class mpistatWalker(BaseWalker):
 
         # mpistat file and its modification timestamp
         self._mpistat = mpistat
-        self._timestamp = time.epoch(mpistat.stat().st_mtime)
+        self._timestamp = time.epoch((mpistat_stat := mpistat.stat()).st_mtime)
 
         # Log a warning if forcible restat'ing is going to happen
         if time.now() - self._timestamp > _RESTAT_AFTER:
@@ -308,64 +552,172 @@ class mpistatWalker(BaseWalker):
             for vault in self._fetch_vaults(*bases)
         }
 
+        # NOTE mpistat records are parsed as bytes, so the prefixes are
+        # kept as bytes, to be compared without any transcoding
+        self._raw_prefixes = tuple(self._vaults)
+        self._prefixes = _PrefixTree(self._vaults)
+
+        # Encoded vault roots, with their trailing slash, for those that
+        # end on a base64 group boundary (see _is_match)
+        self._aligned = {
+            vault: base64.encode(slashed).encode()
+            for vault in self._vaults.values()
+            if len(slashed := f"{vault.root}/".encode()) % 3 == 0
+        }
+
+        # Vault roots, with their trailing slash, for prefix matching
+        self._roots = {
+            vault: f"{vault.root}/"
+            for vault in self._vaults.values()
+        }
+
+        # The cache is named by the set of vaults we're walking and the
+        # mpistat file's identity, so any change to either invalidates
+        # it; the former also tells us which caches we supersede
+        self._cache = None
+        if cache is not None:
+            self._cache_prefix = f"mpistat-{_digest(*sorted(self._roots.values()))}-"
+            records = _digest(mpistat, mpistat_stat.st_mtime_ns, mpistat_stat.st_size)
+            self._cache = cache / f"{self._cache_prefix}{records}.records"
+
     @staticmethod
-    def _base64_prefix(path: T.Path) -> str:
+    def _base64_prefix(path: T.Path) -> bytes:
         # Find the common base64 prefix of a path to optimise searching
         bare = base64.encode(path)
         slashed = base64.encode(f"{path}/")
 
-        return commonprefix([bare, slashed])
+        return commonprefix([bare, slashed]).encode("ascii")
 
     def _is_match(
-            self, encoded_path: str) -> T.Optional[T.Tuple[Vault, T.Path]]:
+            self, encoded_path: bytes) -> T.Optional[T.Tuple[Vault, T.Path]]:
         """ Check that an encoded path is in one of our vaults """
-        for prefix, vault in self._vaults.items():
-            if encoded_path.startswith(prefix):
-                # Only base64 decode if there's a potential match
-                decoded_path = T.Path(base64.decode(encoded_path).decode())
-
-                # Check if we have an actual match
-                try:
-                    _ = decoded_path.relative_to(vault.root)
-                    return vault, decoded_path
-                except ValueError:
-                    # If decoded_path is not a child of the vault
-                    # root, then rinse and repeat...
-                    continue
+        if not (candidates := self._prefixes.match(encoded_path)):
+            return None
+
+        decoded_path = None
+        for vault in candidates:
+            if (aligned := self._aligned.get(vault)) is not None:
+                # When the slashed vault root fills whole base64 groups,
+                # then the encoding of any path under it starts with the
+                # root's encoding, followed by the encoding of the path
+                # relative to the root; so we need only decode the latter
+                if encoded_path.startswith(aligned):
+                    relative = base64.decode(encoded_path[len(aligned):])
+                    return vault, vault.root / relative.decode()
+
+                continue
+
+            # Only base64 decode (once) if there's a potential match
+            if decoded_path is None:
+                decoded_path = base64.decode(encoded_path).decode()
+
+            # Check if we have an actual match
+            # NOTE mpistat records absolute, normalised paths, so a
+            # string prefix check suffices, which is much cheaper than
+            # PurePath.relative_to raising ValueError on a mismatch
+            if decoded_path.startswith(self._roots[vault]):
+                return vault, T.Path(decoded_path)
+
+            # If decoded_path is not a child of the vault root, then
+            # rinse and repeat...
 
         # ...until no match
         return None
 
     @staticmethod
-    def _make_stat(*stats: str) -> os.stat_result:
+    def _make_stat(*stats: bytes) -> os.stat_result:
         """ Convert an mpistat record into an os.stat_result """
         # WARNING os.stat_result does not have a documented interface
-        assert len(stats) == 10
-        return os.stat_result((
-            stat.S_IFREG,         # Mode: Regular file with null permissions
-            int(stats[_INODE]),   # inode ID
-            int(stats[_DEVICE]),  # Device ID
-            int(stats[_NLINKS]),  # Number of hardlinks
-            int(stats[_OWNER]),   # Owner ID
-            int(stats[_GROUP]),   # Group ID
-            int(stats[_SIZE]),    # Size
-            int(stats[_ATIME]),   # Last accessed time
-            int(stats[_MTIME]),   # Last modified time
-            int(stats[_CTIME])    # Last changed time
-        ))
+        # NOTE Mode: Regular file with null permissions
+        return os.stat_result((stat.S_IFREG, *map(int, _stat_fields(stats))))
+
+    def _records(self) -> T.Iterator[bytes]:
+        """
+        Generate the raw mpistat records that could be regular files in
+        our vaults, from the cache if possible, otherwise by filtering
+        the mpistat output (and caching the result, if required)
+
+        @return  Generator of records
+        """
+        cache = self._cache
+        if cache is not None and cache.is_file():
+            self.log.info("Using cached mpistat records from %s", cache)
+            with cache.open(mode="rb") as cached:
+                yield from cached
+
+            return
+
+        # NOTE Iterating over the buffered stream is done at C-level;
+        # the encoded path leads each record, so we can reject the vast
+        # majority, that aren't in any of our vaults, before doing any
+        # decoding or splitting. We only care about regular files; the
+        # mode is the only non-numeric field after the (tab-free)
+        # encoded path, so a substring search rejects everything else
+        prefixes = self._raw_prefixes
+        if cache is None:
+            with _decompress(self._mpistat) as mpistat:
+                yield from (
+                    line for line in mpistat
+                    if line.startswith(prefixes) and _REGULAR_FILE in line
+                )
+
+            return
+
+        # Write the filtered records to a staging file, which only
+        # becomes the cache once the whole mpistat output has been read
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        staging = tempfile.NamedTemporaryFile(dir=cache.parent, delete=False)
+
+        try:
+            with staging, _decompress(self._mpistat) as mpistat:
+                for line in mpistat:
+                    if line.startswith(prefixes) and _REGULAR_FILE in line:
+                        staging.write(line)
+                        yield line
+
+            os.replace(staging.name, cache)
+
+        except BaseException:
+            os.unlink(staging.name)
+            raise
+
+        # NOTE Only the latest cache for this set of vaults is retained:
+        # any other cached records for the same set are for superseded
+        # mpistat output, so they're removed rather than left to
+        # accumulate. Caches for other sets of vaults, which may belong
+        # to other runs sharing the cache directory, are left alone
+        for stale in cache.parent.glob(f"{self._cache_prefix}*.records"):
+            if stale != cache:
+                with suppress(FileNotFoundError):
+                    stale.unlink()
 
     def files(self) -> T.Iterator[T.Tuple[Vault, File, _VaultStatusT]]:
-        with gzip.open(self._mpistat, mode="rt") as mpistat:
+        # NOTE This loop runs for every relevant record in the mpistat
+        # output, so we bind everything it looks up to locals beforehand
+        is_match = self._is_match
+        make_stat = mpistatWalker._make_stat
+        vault_status = mpistatWalker._vault_status
+        from_stat = File.FromStat
+        timestamp = self._timestamp
+
+        for line in self._records():
             # Strip excess whitespace and split each line by tabs
-            while fields := mpistat.readline().strip().split("\t"):
-                encoded, *stats = fields
-
-                # We only care about regular files that are in the
-                # vaults we are interested in (per the constructor)
-                if stats[_MODE] == "f" and \
-                   (match := self._is_match(encoded)) is not None:
-
-                    vault, path = match
-                    yield vault, \
-                        File.FromStat(path, mpistatWalker._make_stat(*stats), self._timestamp), \
-                        mpistatWalker._vault_status(vault, path)
+            # NOTE Only the path needs decoding (per _is_match); the
+            # remaining fields are used as bytes, which int accepts
+            fields = line.strip().split(b"\t")
+            if len(fields) != _MPISTAT_FIELDS:
+                # Skip malformed (e.g., blank or truncated) records
+                continue
+
+            encoded, *stats = fields
+
+            # Check the mode field is where we expect, and that the file
+            # is in one of the vaults we are interested in (per the
+            # constructor)
+            if stats[_MODE] == b"f" and \
+               (match := is_match(encoded)) is not None:
+
+                vault, path = match
+                yield vault, \
+                    from_stat(path, make_stat(*stats), timestamp), \
+                    vault_status(vault, path)
@@ -23,7 +23,11 @@ with this program. If not, see https://www.gnu.org/licenses/
 
 import os
 import sys
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from enum import Enum
+from functools import singledispatch
+from itertools import islice
 
 import core.vault
 from api.config import Executable
@@ -38,10 +42,44 @@ from core.idm import base as IDMBase
 from . import usage
 from .recover import derelativise
 from .recover import exception as RecoverExc
-from .recover import move_with_path_safety_checks, relativise
+from .recover import move_with_path_safety_checks, relativiser
 
 config, idm = generate_config(Executable.VAULT)
 
+# Environment variables setting the number of concurrent file additions
+# and recoveries, respectively, and their default
+_ADD_THREADS = "VAULT_ADD_THREADS"
+_RECOVER_THREADS = "VAULT_RECOVER_THREADS"
+_DEFAULT_THREADS = 8
+
+# Number of lines of output to write at once when viewing branches
+_VIEW_BATCH = 1024
+
+# Number of files to take at once when adding them
+_ADD_CHUNK = 1024
+
+
+def _threads(variable: str) -> int:
+    """
+    Get the number of concurrent operations from the environment,
+    falling back to the default if it's unset or invalid
+
+    @param   variable  Environment variable
+    @return  Number of threads
+    """
+    if (value := os.getenv(variable)) is None:
+        return _DEFAULT_THREADS
+
+    try:
+        if (threads := int(value)) >= 1:
+            return threads
+    except ValueError:
+        pass
+
+    log.warning("%s must be a positive integer, not \"%s\"; using %d threads",
+                variable, value, _DEFAULT_THREADS)
+    return _DEFAULT_THREADS
+
 
 def _create_vault(relative_to: T.Path,
                   idm: IDMBase.IdentityManager = idm) -> Vault:
@@ -55,7 +93,32 @@ def _create_vault(relative_to: T.Path,
         sys.exit(1)
 
 
-class ViewContext(Enum):
+def _vault_cache(idm: IDMBase.IdentityManager = idm) -> T.Callable[[T.Path], Vault]:
+    """
+    Build a memoised vault constructor for files, keyed by their vault's
+    root, so each vault is only constructed once. Finding the root walks
+    up the directory tree, so that's memoised by the files' parent
+    directory, as every file in a directory belongs to the same vault
+
+    @param   idm  Identity manager
+    @return  Vault constructor
+    """
+    roots: T.Dict[T.Path, T.Path] = {}
+    vaults: T.Dict[T.Path, Vault] = {}
+
+    def _vault(path: T.Path) -> Vault:
+        if (root := roots.get(directory := path.parent)) is None:
+            root = roots[directory] = Vault._find_root(path)
+
+        if (vault := vaults.get(root)) is None:
+            vault = vaults[root] = _create_vault(path, idm)
+
+        return vault
+
+    return _vault
+
+
+class ViewContext(str, Enum):
     All = "all"
     Here = "here"
     Mine = "mine"
@@ -72,86 +135,252 @@ def view(branch: Branch, view_mode: ViewContext, absolute: bool,
         ViewContext.Mine: files owned by current user
     :param absolute: - Whether to view absolute paths or not
     """
+    view_many([branch], view_mode, absolute, idm)
+
+
+def _mode_suffix(view_mode: ViewContext) -> str:
+    """ Qualification of a view's summary by its view mode """
+    if view_mode is ViewContext.Here:
+        return " in the current directory"
+
+    if view_mode is ViewContext.Mine:
+        return " owned by the current user"
+
+    return ""
+
+
+def view_many(branches: T.Iterable[Branch], view_mode: ViewContext,
+              absolute: bool, idm: IDMBase.IdentityManager = idm) -> None:
+    """ List the contents of the given branches, in turn, of the same vault
+
+    :param branches: Which Vault branches we're going to look at
+    :param view_mode: See view
+    :param absolute: - Whether to view absolute paths or not
+    """
     cwd = file.cwd()
     vault = _create_vault(cwd, idm)
-    count = 0
-    for path, _limbo_file in vault.list(branch):
-        relative_path = relativise(path, cwd)
-        if view_mode == ViewContext.Here and "/" in str(relative_path):
-            continue
-        elif view_mode == ViewContext.Mine and path.stat().st_uid != os.getuid():
-            continue
+    relativise = relativiser(cwd)
+    me = os.getuid()
+    now = time.now()
+    hours = time.delta(hours=1)
+    limbo_ttl = config.deletion.limbo
+
+    # NOTE Lines are encoded as filesystem paths and written straight to
+    # the binary stream, bypassing the text layer's encoding and buffer,
+    # unless standard output has been replaced by a text-only stream
+    # (e.g., io.StringIO), in which case they're decoded back
+    stdout = sys.stdout
+    if (stdout_buffer := getattr(stdout, "buffer", None)) is not None:
+        stdout.flush()
+        write, flush = stdout_buffer.write, stdout_buffer.flush
+
+    else:
+        def write(data: bytes) -> None:
+            stdout.write(os.fsdecode(data))
+
+        flush = stdout.flush
+
+    for branch in branches:
+        count = 0  # i.e., if the listing is empty
+        limbo = branch is Branch.Limbo
+
+        # NOTE Output is buffered into batches of lines, rather than
+        # printed line-by-line, which would flush on every line to a
+        # terminal
+        lines: T.List[bytes] = []
+
+        # NOTE Each file in the branch is hardlinked to its source
+        # (except in Limbo, where it's the only link), so the stat
+        # information from its directory entry, which is cached, serves
+        # for both owner and age. The view mode's filter is chosen once,
+        # outside the loop.
+        listing = (
+            (path, entry, relativise(path))
+            for path, entry in vault.scan(branch)
+        )
+
+        if view_mode is ViewContext.Here:
+            listing = (
+                (path, entry, relative_path)
+                for path, entry, relative_path in listing
+                if "/" not in str(relative_path)
+            )
 
-        if branch == Branch.Limbo:
-            time_to_live = config.deletion.limbo - \
-                (time.now() - time.epoch(_limbo_file.stat().st_mtime))
-            print(
-                relative_path if absolute else relative_path,
-                f"{round(time_to_live/time.delta(hours=1), 1)} hours", sep="\t"
+        elif view_mode is ViewContext.Mine:
+            listing = (
+                (path, entry, relative_path)
+                for path, entry, relative_path in listing
+                if entry.stat(follow_symlinks=False).st_uid == me
             )
-        else:
-            print(path if absolute else relative_path)
 
-        count += 1
-    log.info(f"""{branch} branch of the vault in {vault.root} contains {count} files
-        {'in the current directory' if view_mode == ViewContext.Here
-        else 'owned by the current user' if view_mode == ViewContext.Mine
-        else ''}""")
+        for count, (path, entry, relative_path) in enumerate(listing, 1):
+            if limbo:
+                time_to_live = limbo_ttl - \
+                    (now - time.epoch(entry.stat(follow_symlinks=False).st_mtime))
+                lines.append(os.fsencode(
+                    f"{relative_path}\t{round(time_to_live / hours, 1)} hours\n"))
+            else:
+                lines.append(
+                    os.fsencode(f"{path if absolute else relative_path}\n"))
 
+            if len(lines) == _VIEW_BATCH:
+                write(b"".join(lines))
+                lines.clear()
+
+        write(b"".join(lines))
+        flush()
+
+        log.info("%s branch of the vault in %s contains %d files%s",
+                 branch, vault.root, count, _mode_suffix(view_mode))
+
+
+# Expected failures of adding files, which are logged rather than raised
+_ADD_FAILURES = (core.vault.exception.VaultCorruption,
+                 core.vault.exception.PermissionDenied,
+                 core.vault.exception.PhysicalVaultFile)
+
+
+@singledispatch
+def _log_add_failure(failure: Exception) -> None:
+    """ Log an expected failure of adding a file """
+    raise failure
+
+
+@_log_add_failure.register
+def _(failure: core.vault.exception.VaultCorruption) -> None:
+    # Corruption detected
+    log.critical("Corruption detected: %s", failure)
+    log.info("Contact HGI to resolve this corruption")
+
+
+@_log_add_failure.register
+def _(failure: core.vault.exception.PermissionDenied) -> None:
+    # User does have permission to add files
+    log.error("Permission denied: %s", failure)
 
-def add(branch: Branch, files: T.Iterable[T.Path]) -> None:
-    """ Add the given files to the appropriate branch """
-    for f in files:
-        if not file.is_regular(f):
-            # Skip non-regular files
-            log.warning(f"Cannot add {f}: Doesn't exist or is not regular")
-            continue
 
+@_log_add_failure.register
+def _(failure: core.vault.exception.PhysicalVaultFile) -> None:
+    # Trying to add a vault file to the vault
+    log.error("Cannot add: %s", failure)
+
+
+@contextmanager
+def _add_errors() -> T.Iterator[None]:
+    """ Log, rather than raise, the expected failures of adding files """
+    try:
+        yield
+
+    except _ADD_FAILURES as e:
+        _log_add_failure(e)
+
+
+def _add(vault: Vault, branch: Branch,
+         files: T.Iterable[T.Path]) -> T.List[Exception]:
+    """
+    Add the given files, in order, to the appropriate branch of a vault
+
+    NOTE This is run concurrently, so expected failures are returned,
+    rather than logged, for the caller to log in a deterministic order
+
+    @param   vault   Vault
+    @param   branch  Branch
+    @param   files   Files to add
+    @return  Expected failures, in order
+    """
+    failures: T.List[Exception] = []
+    for f in files:
         try:
-            vault = _create_vault(f)
             vault.add(branch, f)
+        except _ADD_FAILURES as e:
+            failures.append(e)
 
-        except core.vault.exception.VaultCorruption as e:
-            # Corruption detected
-            log.critical(f"Corruption detected: {e}")
-            log.info("Contact HGI to resolve this corruption")
+    return failures
 
-        except core.vault.exception.PermissionDenied as e:
-            # User does have permission to add files
-            log.error(f"Permission denied: {e}")
 
-        except core.vault.exception.PhysicalVaultFile as e:
-            # Trying to add a vault file to the vault
-            log.error(f"Cannot add: {e}")
+def _log_additions(additions: T.List[Future]) -> None:
+    """
+    Wait for every addition, then log their expected failures, in order,
+    before propagating the first unexpected failure, if any
+
+    @param  additions  Futures of _add, in submission order
+    """
+    wait(additions)
+
+    unexpected: T.Optional[BaseException] = None
+    for addition in additions:
+        if (error := addition.exception()) is not None:
+            unexpected = unexpected or error
+            continue
+
+        for failure in addition.result():
+            _log_add_failure(failure)
+
+    if unexpected is not None:
+        raise unexpected
+
+
+def add(branch: Branch, files: T.Iterable[T.Path]) -> None:
+    """ Add the given files to the appropriate branch """
+    # NOTE Adding files is latency-bound on network filesystems, so we
+    # keep multiple additions in flight. However, each vault tracks files
+    # by inode, so any files that share one in the same vault are added
+    # in turn, in order; hardlinks can be in different vaults, though.
+    # Files are taken in bounded chunks, each finished before the next,
+    # so a FOFN is still read lazily.
+    vault_for = _vault_cache()
+    files = iter(files)
+
+    with ThreadPoolExecutor(max_workers=_threads(_ADD_THREADS)) as executor:
+        while chunk := list(islice(files, _ADD_CHUNK)):
+            inodes: T.Dict[T.Tuple[T.Path, int, int],
+                           T.Tuple[Vault, T.List[T.Path]]] = {}
+            for f in chunk:
+                if (f_stat := file.regular_stat(f)) is None:
+                    # Skip non-regular files
+                    log.warning("Cannot add %s: Doesn't exist or is not regular", f)
+                    continue
+
+                with _add_errors():
+                    vault = vault_for(f)
+                    _, batch = inodes.setdefault(
+                        (vault.root, f_stat.st_dev, f_stat.st_ino), (vault, []))
+                    batch.append(f)
+
+            _log_additions([
+                executor.submit(_add, vault, branch, batch)
+                for vault, batch in inodes.values()
+            ])
 
 
 def untrack(files: T.Iterable[T.Path]) -> None:
     """ Untrack the given files """
+    vault_for = _vault_cache()
     for f in files:
         if not file.is_regular(f):
             # Skip non-regular files
-            log.warning(f"Cannot untrack {f}: Doesn't exist or is not regular")
+            log.warning("Cannot untrack %s: Doesn't exist or is not regular", f)
             log.info(
                 "Contact HGI if a file exists in the vault, but has been deleted outside")
             continue
 
-        vault = _create_vault(f)
+        vault = vault_for(f)
         if (branch := vault.branch(f)) is not None:
             try:
                 vault.remove(branch, f)
 
             except core.vault.exception.VaultCorruption as e:
                 # Corruption detected
-                log.critical(f"Corruption detected: {e}")
+                log.critical("Corruption detected: %s", e)
                 log.info("Contact HGI to resolve this corruption")
 
             except core.vault.exception.PermissionDenied as e:
                 # User doesn't have permission to remove files
-                log.error(f"Permission denied: {e}")
+                log.error("Permission denied: %s", e)
 
             except core.idm.exception.NoSuchIdentity as e:
                 # IdM doesn't know about the vault's group
-                log.critical(f"Unknown vault group: {e}")
+                log.critical("Unknown vault group: %s", e)
                 log.info("Contact HGI to resolve this inconsistency")
 
             except core.vault.exception.PhysicalVaultFile:
@@ -159,6 +388,72 @@ def untrack(files: T.Iterable[T.Path]) -> None:
                 pass
 
 
+def _recover(source: T.Path, destination: T.Path) -> None:
+    """
+    Recover a file from the Limbo branch, logging any failure
+
+    @param  source       Path to the file in the Limbo branch
+    @param  destination  Path to which the file is to be recovered
+    """
+    try:
+        move_with_path_safety_checks(source, destination)
+    except RecoverExc.NoSourceFound as e:
+        log.error("Recovery source %s does not exist: %s", source, e)
+    except RecoverExc.NoParentForDestination as e:
+        log.error("%s", e)
+    except RecoverExc.DestinationAlreadyExists:
+        log.error("Destination %s already has an existing file", destination)
+
+
+def _recoverable(vault: Vault, wanted: T.Optional[T.AbstractSet[str]] = None
+                 ) -> T.Iterator[T.Tuple[T.Path, T.Path]]:
+    """
+    Generate the files in the Limbo branch to recover, each paired with
+    the path to which it is to be recovered
+
+    @param   vault   Vault
+    @param   wanted  Vault-relative source paths of the files to recover
+                     (None for every file)
+    @return  Generator of Limbo and destination paths
+    """
+    bpath = vault.location / Branch.Limbo
+    vault_root = vault.root
+
+    # Limbo paths are sliced from this offset to be relative to the branch
+    offset = len(os.path.join(bpath, ""))
+
+    # NOTE Each destination is only claimed once, so recoveries (which
+    # may be concurrent) can't race to the same file
+    claimed: T.Set[str] = set()
+
+    for entry in file.walk(bpath):
+        limbo_relative_path = T.Path(entry.path[offset:])
+        try:
+            vfk = VaultFileKey.Reconstruct(limbo_relative_path)
+        except Exception as e:
+            raise core.vault.exception.VaultCorruption(
+                f"Failed to reconstruct VaultFileKey for {limbo_relative_path}")
+
+        source = str(vfk.source)
+        if wanted is not None and source not in wanted:
+            continue
+
+        original_file = vault_root / source
+        if source in claimed:
+            log.error("Destination %s already has an existing file",
+                      original_file)
+            continue
+
+        # NOTE The Limbo file is where we found it, so we use its path
+        # as-is, rather than joining the branch to its rebuilt key path
+        claimed.add(source)
+        yield T.Path(entry.path), original_file
+
+        # Stop walking once every requested file has been found
+        if wanted is not None and len(claimed) == len(wanted):
+            return
+
+
 def recover(files: T.Optional[T.Iterable[T.Path]] = None) -> None:
     """
     Recover the given files from Limbo branch or Recover all files from
@@ -169,44 +464,27 @@ def recover(files: T.Optional[T.Iterable[T.Path]] = None) -> None:
     """
     cwd = file.cwd()
     vault = _create_vault(cwd)
-    bpath = vault.location / Branch.Limbo
-
-    RECOVER_ALL = files is None
 
-    if not RECOVER_ALL:
+    # NOTE Files are identified by their vault-relative source paths,
+    # as strings, which saves the per-entry overhead of joining, hashing
+    # and comparing Path objects
+    wanted = None
+    if files is not None:
         vault_root = vault.root
-        files_to_recover = {
-            vault_root / derelativise(path, cwd, vault_root): path for path in files}
-    for dirname, _, files in os.walk(bpath):
-        for f in files:
-            limbo_relative_path = T.Path(dirname, f).relative_to(bpath)
-            try:
-                vfk = VaultFileKey.Reconstruct(limbo_relative_path)
-            except Exception as e:
-                raise core.vault.exception.VaultCorruption(
-                    f"Failed to reconstruct VaultFileKey for {limbo_relative_path}")
-
-            original_file = vault.root / vfk.source
-            vfkpath = bpath / vfk.path
-            if RECOVER_ALL or original_file in files_to_recover:
-                try:
-                    move_with_path_safety_checks(vfkpath, original_file)
-                except RecoverExc.NoSourceFound as e:
-                    log.error(f"Recovery source {vfkpath} does not exist: {e}")
-                except RecoverExc.NoParentForDestination:
-                    log.error(
-                        f"Source path exists {vfkpath} but destination parent {original_file.parent} does not exist")
-                except RecoverExc.DestinationAlreadyExists:
-                    log.error(
-                        f"Destination {original_file} already has an existing file")
-
-
-# Mapping of view contexts to enumeration
-_view_contexts = {
-    "all": ViewContext.All,
-    "here": ViewContext.Here,
-    "mine": ViewContext.Mine
-}
+        wanted = frozenset(
+            str(derelativise(path, cwd, vault_root)) for path in files)
+
+    # NOTE Recovery is latency-bound on network filesystems, so we keep
+    # multiple recoveries in flight while walking the Limbo branch
+    with ThreadPoolExecutor(max_workers=_threads(_RECOVER_THREADS)) as executor:
+        recoveries = [
+            executor.submit(_recover, source, destination)
+            for source, destination in _recoverable(vault, wanted)
+        ]
+
+        # Propagate any unexpected failures
+        for recovery in recoveries:
+            recovery.result()
 
 
 def main(argv: T.List[str] = sys.argv) -> None:
@@ -216,17 +494,17 @@ def main(argv: T.List[str] = sys.argv) -> None:
     # e.g. "archive" action can map to Stash or Staged branches.
     if args.action == "keep":
         if context := args.view:
-            view(Branch.Keep, _view_contexts[context], args.absolute)
+            view(Branch.Keep, ViewContext(context), args.absolute)
         else:
             if args.files:
                 add(Branch.Keep, args.files)
 
     if args.action == "archive":
         if context := args.view:
-            view(Branch.Archive, _view_contexts[context], args.absolute)
-            view(Branch.Stash, _view_contexts[context], args.absolute)
+            view_many([Branch.Archive, Branch.Stash],
+                      ViewContext(context), args.absolute)
         elif context := args.view_staged:
-            view(Branch.Staged, _view_contexts[context], args.absolute)
+            view(Branch.Staged, ViewContext(context), args.absolute)
         else:
             if args.stash:
                 branch = Branch.Stash
@@ -237,7 +515,7 @@ def main(argv: T.List[str] = sys.argv) -> None:
 
     if args.action == "recover":
         if context := args.view:
-            view(Branch.Limbo, _view_contexts[context], args.absolute)
+            view(Branch.Limbo, ViewContext(context), args.absolute)
         else:
             recover(None if args.all else args.files)
 
@@ -17,12 +17,18 @@ You should have received a copy of the GNU General Public License along
 with this program. If not, see https://www.gnu.org/licenses/
 """
 
+import os
 from os.path import relpath
 
 from core import file, typing as T
 from api.logging import log
 
 
+# Directories are opened purely to be referenced by dir_fd, which (unlike
+# reading them) only requires search permission, where O_PATH is supported
+_DIRECTORY_REFERENCE = getattr(os, "O_PATH", os.O_RDONLY)
+
+
 class exception(T.SimpleNamespace):
     """ Namespace of exceptions to make importing easier """
     class NoSourceFound(Exception):
@@ -52,6 +58,30 @@ def relativise(path: T.Path, working_directory: T.Path) -> T.Path:
     return T.Path(relpath(path, working_directory))
 
 
+def relativiser(working_directory: T.Path) -> T.Callable[[T.Path], T.Path]:
+    """
+    Build a function that relativises many paths against the same
+    working directory
+
+    NOTE The paths and working directory must be absolute and normalised,
+    as vault listings are; those under the working directory then just
+    have it stripped as a prefix, rather than being compared part by part
+
+    @param   working_directory  Absolute working directory
+    @return  Function that relativises paths
+    """
+    prefix = os.path.join(working_directory, "")
+    offset = len(prefix)
+
+    def _relativise(path: T.Path) -> T.Path:
+        if (spath := str(path)).startswith(prefix):
+            return T.Path(spath[offset:])
+
+        return relativise(path, working_directory)
+
+    return _relativise
+
+
 def derelativise(path: T.Path, working_directory: T.Path,
                  vault_root: T.Path) -> T.Path:
     """
@@ -72,7 +102,7 @@ def derelativise(path: T.Path, working_directory: T.Path,
     output: this/is/relative/path
     """
 
-    full_path = (vault_root / working_directory / path).resolve()
+    full_path = file.resolve(vault_root / working_directory / path)
     return T.Path(relpath(full_path, vault_root))
 
 
@@ -88,17 +118,41 @@ def move_with_path_safety_checks(
 
     """
 
-    if not full_source_path.exists():
+    try:
+        _ = os.lstat(full_source_path)
+    except FileNotFoundError:
         raise exception.NoSourceFound(
             f"Source file {full_source_path} does not exist")
-    if not full_dest_path.parent.exists():
+
+    # NOTE We open the destination's parent directory once and work
+    # relative to it, so its path needn't be resolved for every check
+    try:
+        parent_fd = os.open(full_dest_path.parent,
+                            _DIRECTORY_REFERENCE | os.O_DIRECTORY)
+    except FileNotFoundError:
         raise exception.NoParentForDestination(
             f"Source path exists {full_source_path} but destination parent {full_dest_path.parent} does not exist")
-    if full_dest_path.exists():
-        raise exception.DestinationAlreadyExists(
-            f"Destination {full_dest_path} already has an existing file")
-
-    full_source_path.replace(full_dest_path)
-    log.debug(f"{full_source_path} moved to {full_dest_path} ")
-    file.touch(full_dest_path)
-    log.info(f"File has been restored at {full_dest_path}")
+
+    try:
+        name = full_dest_path.name
+        try:
+            _ = os.stat(name, dir_fd=parent_fd)
+            raise exception.DestinationAlreadyExists(
+                f"Destination {full_dest_path} already has an existing file")
+        except FileNotFoundError:
+            pass
+
+        # NOTE The source could still vanish before it's moved
+        try:
+            os.replace(full_source_path, name, dst_dir_fd=parent_fd)
+        except FileNotFoundError:
+            raise exception.NoSourceFound(
+                f"Source file {full_source_path} does not exist")
+
+        log.debug("%s moved to %s", full_source_path, full_dest_path)
+        file.touch(name, dir_fd=parent_fd)
+
+    finally:
+        os.close(parent_fd)
+
+    log.info("File has been restored at %s", full_dest_path)
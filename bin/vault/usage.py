@@ -22,10 +22,12 @@ with this program. If not, see https://www.gnu.org/licenses/
 """
 
 import argparse
+import os
 from dataclasses import dataclass
+from functools import partial
 
 from api.logging import log
-from core import typing as T
+from core import file, typing as T
 from bin.common import version
 
 
@@ -38,6 +40,7 @@ class _ActionText:
 
 
 _absolute_help: str = "use absolute file paths"
+_view_modes: T.Tuple[str, ...] = ("all", "here", "mine")
 _view_mode_help: str = """
 all: show every file in the branch (default),
 here: show every file in the branch from the current working directory,
@@ -45,6 +48,8 @@ mine: show every file in the branch owned by the current user
 """
 _archive_staged_help: str = "view files staged for archival. these will be archived soon"
 
+# Maximum number of FILE arguments accepted by keep and archive
+_MAX_INLINE_FILES: int = 10
 
 _actions = {
     "keep": _ActionText("file retention operations",
@@ -66,43 +71,35 @@ _actions = {
 }
 
 
-def _parser_factory():
-    """ Build an argument parser meeting requirements """
-    top_level = argparse.ArgumentParser("vault")
-    top_level.add_argument("--version", action="version",
-                           version=f"%(prog)s {version.vault}")
-
-    sub_level = top_level.add_subparsers(
-        description="Operations on files against their respective vault",
-        required=True,
-        dest="action",
-        metavar="ACTION")
-
-    action_level = {}
-
-    action = "keep"
-    sub_parser = sub_level.add_parser(action, help=_actions[action].help)
-    sub_parser.usage = _actions[action].usage
-    sub_parser.add_argument(
-        "--view",
-        choices=["all", "here", "mine"],
+def _add_view(container: T.Any, help: str, flag: str = "--view") -> None:
+    """ Add a view mode option to a parser or argument group """
+    container.add_argument(
+        flag,
         nargs="?",
         const="all",
-        help=_actions[action].view_help)
+        choices=_view_modes,
+        help=help)
+
 
+def _add_absolute(sub_parser: argparse.ArgumentParser) -> None:
+    """ Add the absolute paths option to a subparser """
     sub_parser.add_argument(
         "--absolute",
         action="store_true",
         help=_absolute_help
     )
 
+
+def _add_files(sub_parser: argparse.ArgumentParser, action: str,
+               files_help: str) -> None:
+    """ Add the mutually exclusive FOFN and FILE arguments to a subparser """
     files_mutually_exclusive_group = sub_parser.add_mutually_exclusive_group()
 
     files_mutually_exclusive_group.add_argument(
         "--fofn",
         nargs="?",
         type=T.Path,
-        help=f"file of file names to keep",
+        help=f"file of file names to {action}",
         metavar="FOFN")
 
     files_mutually_exclusive_group.add_argument(
@@ -110,192 +107,217 @@ def _parser_factory():
         nargs="*",
         type=T.Path,
         default=[],
-        help=f"file to keep (at most 10)",
+        help=files_help,
         metavar="FILE")
 
+
+def _keep_parser(sub_level: argparse._SubParsersAction) -> argparse.ArgumentParser:
+    """ Build the keep action's subparser """
+    action = "keep"
+    sub_parser = sub_level.add_parser(action, help=_actions[action].help)
+    sub_parser.usage = _actions[action].usage
+    _add_view(sub_parser, _actions[action].view_help)
+    _add_absolute(sub_parser)
+    _add_files(sub_parser, action, f"file to keep (at most {_MAX_INLINE_FILES})")
+
+    return sub_parser
+
+
+def _archive_parser(sub_level: argparse._SubParsersAction) -> argparse.ArgumentParser:
+    """ Build the archive action's subparser """
     action = "archive"
     sub_parser = sub_level.add_parser(action, help=_actions[action].help)
     sub_parser.usage = _actions[action].usage
     archive_mutually_exclusive_group = sub_parser.add_mutually_exclusive_group()
-    archive_mutually_exclusive_group.add_argument(
-        "--view",
-        nargs="?",
-        const="all",
-        choices=["all", "here", "mine"],
-        help=_actions[action].view_help)
-
-    archive_mutually_exclusive_group.add_argument(
-        "--view-staged",
-        nargs="?",
-        const="all",
-        choices=["all", "here", "mine"],
-        help=_archive_staged_help
-    )
+    _add_view(archive_mutually_exclusive_group, _actions[action].view_help)
+    _add_view(archive_mutually_exclusive_group, _archive_staged_help,
+              "--view-staged")
     archive_mutually_exclusive_group.add_argument(
         "--stash",
         action="store_true",
         help="archive without deleting the source file"
     )
-    sub_parser.add_argument(
-        "--absolute",
-        action="store_true",
-        help=_absolute_help
-    )
+    _add_absolute(sub_parser)
+    _add_files(sub_parser, action, f"file to archive (at most {_MAX_INLINE_FILES})")
 
-    files_mutually_exclusive_group = sub_parser.add_mutually_exclusive_group()
+    return sub_parser
 
-    files_mutually_exclusive_group.add_argument(
-        "--fofn",
-        nargs="?",
-        type=T.Path,
-        help=f"file of file names to archive",
-        metavar="FOFN")
-
-    files_mutually_exclusive_group.add_argument(
-        "files",
-        nargs="*",
-        type=T.Path,
-        default=[],
-        help=f"file to archive (at most 10)",
-        metavar="FILE")
 
+def _recover_parser(sub_level: argparse._SubParsersAction) -> argparse.ArgumentParser:
+    """ Build the recover action's subparser """
     action = "recover"
     sub_parser = sub_level.add_parser(action, help=_actions[action].help)
     sub_parser.usage = _actions[action].usage
-    sub_parser.add_argument(
-        "--view",
-        nargs="?",
-        const="all",
-        choices=["all", "here", "mine"],
-        help=_actions[action].view_help)
-
-    sub_parser.add_argument(
-        "--absolute",
-        action="store_true",
-        help=_absolute_help
-    )
-
+    _add_view(sub_parser, _actions[action].view_help)
+    _add_absolute(sub_parser)
     sub_parser.add_argument(
         "--all",
         action="store_true",
         help="recover all recoverable files")
+    _add_files(sub_parser, action, "file to recover")
 
-    files_mutually_exclusive_group = sub_parser.add_mutually_exclusive_group()
+    return sub_parser
 
-    files_mutually_exclusive_group.add_argument(
-        "--fofn",
-        nargs="?",
-        type=T.Path,
-        help=f"file of file names to recover",
-        metavar="FOFN")
-
-    files_mutually_exclusive_group.add_argument(
-        "files",
-        nargs="*",
-        default=[],
-        type=T.Path,
-        help=f"file to recover",
-        metavar="FILE")
 
+def _untrack_parser(sub_level: argparse._SubParsersAction) -> argparse.ArgumentParser:
+    """ Build the untrack action's subparser """
     action = "untrack"
     sub_parser = sub_level.add_parser(action, help=_actions[action].help)
+    _add_files(sub_parser, action, "file to untrack")
 
-    files_mutually_exclusive_group = sub_parser.add_mutually_exclusive_group()
+    return sub_parser
 
-    files_mutually_exclusive_group.add_argument(
-        "--fofn",
-        nargs="?",
-        type=T.Path,
-        help=f"file of file names to untrack",
-        metavar="FOFN")
 
-    files_mutually_exclusive_group.add_argument(
-        "files",
-        nargs="*",
-        type=T.Path,
-        default=[],
-        help=f"file to untrack",
-        metavar="FILE")
+_subparsers = {
+    "keep": _keep_parser,
+    "archive": _archive_parser,
+    "recover": _recover_parser,
+    "untrack": _untrack_parser,
+}
+
+
+def _check_files(parsed: argparse.Namespace,
+                 action_parser: argparse.ArgumentParser,
+                 view_flags: str, limit: T.Optional[int] = _MAX_INLINE_FILES) -> None:
+    """ Check the file arguments of an action that wasn't viewed """
+    if parsed.absolute:
+        action_parser.error(
+            f"you must use {view_flags} to use --absolute flag")
+    if not parsed.files and not parsed.fofn:
+        action_parser.error(_actions[parsed.action].args_error)
+    elif limit is not None and len(parsed.files) > limit:
+        # Limit the number of files
+        action_parser.error(
+            f"too many FILEs; you may specify no more than {limit}")
+
+
+def _validate_keep(parsed: argparse.Namespace,
+                   action_parser: argparse.ArgumentParser) -> None:
+    """ Validate the keep action's arguments """
+    if parsed.view:
+        del parsed.files
+        del parsed.fofn
+    else:
+        _check_files(parsed, action_parser, "--view flag")
+
+
+def _validate_archive(parsed: argparse.Namespace,
+                      action_parser: argparse.ArgumentParser) -> None:
+    """ Validate the archive action's arguments """
+    if parsed.view or parsed.view_staged:
+        del parsed.files
+        del parsed.fofn
+    else:
+        _check_files(parsed, action_parser,
+                     "--view flag or --view-staged flag")
+
+
+def _validate_recover(parsed: argparse.Namespace,
+                      action_parser: argparse.ArgumentParser) -> None:
+    """ Validate the recover action's arguments """
+    if parsed.view or (parsed.all and not parsed.absolute):
+        del parsed.files
+        del parsed.fofn
+        if parsed.view and parsed.all:
+            action_parser.error(
+                "cannot accept arguments --view and --all simultaneously")
+    else:
+        _check_files(parsed, action_parser, "--view flag", limit=None)
+
+
+def _validate_untrack(parsed: argparse.Namespace,
+                      action_parser: argparse.ArgumentParser) -> None:
+    """ The untrack action has nothing to validate beyond argparse """
+
+
+_validators = {
+    "keep": _validate_keep,
+    "archive": _validate_archive,
+    "recover": _validate_recover,
+    "untrack": _validate_untrack,
+}
+
+
+def _parser_factory(action: T.Optional[str] = None):
+    """
+    Build an argument parser meeting requirements
+
+    NOTE Only the given action's subparser is built, as that's all that
+    its arguments need; otherwise (i.e., for help, the version, or to
+    reject an unknown action) every action's subparser is built
+
+    @param   action  Action (None, for all actions)
+    @return  Argument parser
+    """
+    top_level = argparse.ArgumentParser("vault")
+    top_level.add_argument("--version", action="version",
+                           version=f"%(prog)s {version.vault}")
+
+    sub_level = top_level.add_subparsers(
+        description="Operations on files against their respective vault",
+        required=True,
+        dest="action",
+        metavar="ACTION")
+
+    # NOTE Each built action's validator is bound to its subparser up
+    # front, so a parse need only look it up by the parsed action
+    validate: T.Dict[str, T.Callable[[argparse.Namespace], None]] = {}
+
+    for name, subparser in _subparsers.items():
+        if action is None or name == action:
+            validate[name] = partial(_validators[name],
+                                     action_parser=subparser(sub_level))
 
     def parser(args: T.List[str]) -> argparse.Namespace:
         # Parse the given arguments and ensure mutual exclusivity
         parsed = top_level.parse_args(args)
-        text = _actions[parsed.action]
         # Delete fofn or file arguments if --view is passed
         # Raise errors in incompatible options are passed
-        if parsed.action == "keep":
-            if parsed.view:
-                del parsed.files
-                del parsed.fofn
-            else:
-                if parsed.absolute:
-                    action_level[parsed.action].error(
-                        "you must use --view flag to use --absolute flag")
-                if not parsed.files and not parsed.fofn:
-                    action_level[parsed.action].error(
-                        _actions[parsed.action].args_error)
-                elif len(parsed.files) > 10:
-                    # Limit number of files to at most 10
-                    action_level[parsed.action].error(
-                        "too many FILEs; you may specify no more than 10")
-
-        if parsed.action == "archive":
-            if parsed.view or parsed.view_staged:
-                del parsed.files
-                del parsed.fofn
-            else:
-                if parsed.absolute:
-                    action_level[parsed.action].error(
-                        "you must use --view flag or --view-staged flag to use --absolute flag")
-                if not parsed.files and not parsed.fofn:
-                    action_level[parsed.action].error(
-                        _actions[parsed.action].args_error)
-                elif len(parsed.files) > 10:
-                    # Limit number of files to at most 10
-                    action_level[parsed.action].error(
-                        "too many FILEs; you may specify no more than 10")
-
-        if parsed.action == "recover":
-            if parsed.view or (parsed.all and not parsed.absolute):
-                del parsed.files
-                del parsed.fofn
-                if parsed.view and parsed.all:
-                    action_level[parsed.action].error(
-                        "cannot accept arguments --view and --all simultaneously")
-            else:
-                if parsed.absolute:
-                    action_level[parsed.action].error(
-                        "you must use --view flag to use --absolute flag")
-                if not parsed.files and not parsed.fofn:
-                    action_level[parsed.action].error(
-                        _actions[parsed.action].args_error)
+        validate[parsed.action](parsed)
 
         def _resolve_path(path: T.Path) -> T.Path:
-            resolved_path = path.resolve()
-            if path.is_symlink():
-                log.warning(
-                    f"{path} is a symlink. Acting on the original file: {resolved_path}")
+            # NOTE We check for a symlink once and pass that on, so the
+            # path is only lstat'd once (plus its directory, the first
+            # time it's seen)
+            is_symlink = path.is_symlink()
+            resolved_path = file.resolve(path, is_symlink=is_symlink)
+            if is_symlink:
+                log.warning("%s is a symlink. Acting on the original file: %s",
+                            path, resolved_path)
             return resolved_path
 
         if "files" in parsed and parsed.files:
             # Resolve all paths
+            # NOTE This is done eagerly, as opposed to the FOFN case, as
+            # there are few FILE arguments and downstream tests the list
+            # for emptiness
             parsed.files = [_resolve_path(path) for path in parsed.files]
 
         if "fofn" in parsed and parsed.fofn is not None:
 
             def _create_fofn_generator(fofn: T.Path) -> T.Iterator[T.Path]:
-                # Check: Any problems with yield from within a context manager?
-                with open(fofn) as file:
-                    while file_line := file.readline():
-                        filepath = T.Path(file_line.rstrip())
-                        yield filepath
+                # NOTE The FOFN is read lazily, with the file's own line
+                # iterator, and each path is resolved as it's read. Lines
+                # are read as bytes and decoded as the filesystem would,
+                # rather than as text in the locale's encoding
+                with open(fofn, "rb") as fofn_file:
+                    for file_line in fofn_file:
+                        yield _resolve_path(T.Path(os.fsdecode(file_line.rstrip())))
+
             parsed.files = _create_fofn_generator(parsed.fofn)
-            # Resolve all paths
-            parsed.files = (_resolve_path(path) for path in parsed.files)
 
         return parsed
 
     return parser
 
 
-parse_args = _parser_factory()
+_parsers: T.Dict[T.Optional[str], T.Callable[[T.List[str]], argparse.Namespace]] = {}
+
+
+def parse_args(args: T.List[str]) -> argparse.Namespace:
+    """ Parse the given arguments, building the parser on first use """
+    action = args[0] if args and args[0] in _subparsers else None
+    if (parser := _parsers.get(action)) is None:
+        parser = _parsers[action] = _parser_factory(action)
+
+    return parser(args)
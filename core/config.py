@@ -84,11 +84,17 @@ NodeT = T.Mapping[str, ValueT]
 
 class _BaseConfig(metaclass=ABCMeta):
     """ Abstract base class for tree-like configuration container """
+    # NOTE A node is built for every sub-branch of the configuration, so
+    # they're kept dict-free; subclasses should also define __slots__
+    __slots__ = ("_contents", "_children")
+
     _contents: NodeT
+    _children: T.Dict[str, _BaseConfig]  # Sub-branch nodes, once accessed
 
     @singledispatchmethod
     def __init__(self, *source: T.Any) -> None:
         """ Build the configuration node from source """
+        self._children = {}
         self._contents = self._build(*source)
         if not self._is_valid:
             raise exception.InvalidSemantics("Configuration did not validate")
@@ -96,6 +102,7 @@ class _BaseConfig(metaclass=ABCMeta):
     @__init__.register(dict)
     def _(self, source: NodeT) -> None:
         """ Build the configuration node from explicit contents """
+        self._children = {}
         self._contents = source
 
     @__init__.register
@@ -105,15 +112,22 @@ class _BaseConfig(metaclass=ABCMeta):
             "Cannot build configuration from nothing")
 
     def __getattr__(self, item: str) -> T.Union[_BaseConfig, ValueT]:
+        if (child := self._children.get(item)) is not None:
+            return child
+
         try:
             contents = self._contents[item]
         except KeyError:
             raise exception.NoSuchSetting(f"No such setting \"{item}\"")
 
-        # We create a (shallow) copy for sub-branches, to avoid
-        # downstream changes to the contents
-        return type(self)(contents.copy(), **self._extra_attr) if isinstance(
-            contents, dict) else contents
+        if not isinstance(contents, dict):
+            return contents
+
+        # NOTE Nodes only ever read their contents, so sub-branches share
+        # them, rather than taking a copy; the node is then reused on
+        # subsequent accesses, rather than being rebuilt every time
+        child = self._children[item] = type(self)(contents, **self._extra_attr)
+        return child
 
     def __dir__(self) -> T.List[str]:
         # Convenience method for REPL use
@@ -21,11 +21,18 @@ with this program. If not, see https://www.gnu.org/licenses/
 """
 
 from abc import ABCMeta, abstractmethod
+from functools import lru_cache
 import os
+import stat
 
 from . import time, typing as T
 
 
+# NOTE Files are usually given from only a few different directories,
+# so each of those is only resolved once per process
+_resolve_directory = lru_cache(maxsize=4096)(os.path.realpath)
+
+
 class exception(T.SimpleNamespace):
     """Namespace of exceptions"""
 
@@ -35,6 +42,9 @@ class exception(T.SimpleNamespace):
 
 class BaseFile(metaclass=ABCMeta):
     """ Base class for files """
+    # NOTE An empty __slots__ allows subclasses to be dict-free
+    __slots__ = ()
+
     @property
     @abstractmethod
     def path(self) -> T.Path:
@@ -59,7 +69,29 @@ def delete(path: T.Path) -> None:
     """
     # NOTE While trivial, this is for the sake of centralisation
     # (i.e., all deletes must go through here)
-    path.unlink()
+    os.unlink(path)
+
+
+def resolve(path: T.Path, *, is_symlink: T.Optional[bool] = None) -> T.Path:
+    """
+    Resolve the given path, as Path.resolve, but with the resolution of
+    its parent directory memoised
+
+    @param   path        Path
+    @param   is_symlink  Whether the path is a symlink, if already known
+                         (otherwise, it's checked)
+    @return  Resolved path
+    """
+    if is_symlink is None:
+        is_symlink = path.is_symlink()
+
+    # NOTE The file name itself is only resolved separately from its
+    # directory when it's not a symlink, a parent directory reference or
+    # empty (e.g., ".", whose parent isn't the directory it refers to)
+    if path.name in ("", "..") or is_symlink:
+        return path.resolve()
+
+    return T.Path(_resolve_directory(str(path.absolute().parent)), path.name)
 
 
 def inode_id(path: T.Path) -> int:
@@ -69,7 +101,25 @@ def inode_id(path: T.Path) -> int:
     @param   path  Path to a regular file
     @return  inode ID
     """
-    return path.stat().st_ino
+    return os.lstat(path).st_ino
+
+
+def regular_stat(path: T.Path) -> T.Optional[os.stat_result]:
+    """
+    Return the stat information of the given path, if it's a regular
+    file, so callers that need both don't have to stat it twice
+
+    @param   path  Path
+    @return  Stat information (None, if not a regular file)
+    """
+    # NOTE A single lstat tells us both that the path isn't a symlink and
+    # that it's a regular file (Path.is_file would follow symlinks)
+    try:
+        path_stat = os.lstat(path)
+    except (OSError, ValueError):
+        return None
+
+    return path_stat if stat.S_ISREG(path_stat.st_mode) else None
 
 
 def is_regular(path: T.Path) -> bool:
@@ -79,8 +129,34 @@ def is_regular(path: T.Path) -> bool:
     @param   path  Path
     @return  Predicate result
     """
-    # NOTE Order is important as Path.is_file looks to follow symlinks
-    return (not path.is_symlink()) and path.is_file()
+    return regular_stat(path) is not None
+
+
+def walk(path: T.Path) -> T.Iterator[os.DirEntry]:
+    """
+    Recursively generate the non-directory entries under the given
+    directory, without following symlinks
+
+    NOTE Unlike os.walk, the directory entries are generated as-is, so
+    callers can use their cached type information and lazily build
+    paths; unreadable directories are likewise skipped
+
+    @param   path  Directory path
+    @return  Generator of directory entries
+    """
+    stack = [path]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    yield entry
 
 
 def hardlinks(path: T.Path) -> int:
@@ -90,11 +166,12 @@ def hardlinks(path: T.Path) -> int:
     @param   path  Path
     @return  Number of hardlinks
     """
-    return path.stat().st_nlink
+    return os.lstat(path).st_nlink
 
 
 def touch(path: T.Path, atime: T.Optional[T.DateTime]
-          = None, mtime: T.Optional[T.DateTime] = None) -> None:
+          = None, mtime: T.Optional[T.DateTime] = None, *,
+          dir_fd: T.Optional[int] = None) -> None:
     """
     Update the access and/or modification time of a given file
 
@@ -107,15 +184,17 @@ def touch(path: T.Path, atime: T.Optional[T.DateTime]
     @param  path   Path
     @param  atime  New access time (None for don't change)
     @param  mtime  New modification time (None for don't change)
+    @param  dir_fd  Directory descriptor to which the path is relative
+                    (None for the working directory)
     """
     if mtime is None and atime is None:
         new_utime = None
     else:
-        file_stat = path.stat()
+        file_stat = os.stat(path, dir_fd=dir_fd)
         new_atime = file_stat.st_atime if atime is None else time.timestamp(
             atime)
         new_mtime = file_stat.st_mtime if mtime is None else time.timestamp(
             mtime)
         new_utime = (new_atime, new_mtime)
 
-    os.utime(path, times=new_utime)
+    os.utime(path, times=new_utime, dir_fd=dir_fd)
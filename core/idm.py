@@ -32,11 +32,17 @@ class exception(T.SimpleNamespace):
 @dataclass(init=False, unsafe_hash=True)
 class _Identity:
     """ Base class for identities """
+    # NOTE Identities are kept dict-free; subclasses should also define
+    # __slots__
+    __slots__ = ("_id",)
+
     _id: int
 
 
 class _User(_Identity, metaclass=ABCMeta):
     """ Abstract base class for user identities """
+    __slots__ = ()
+
     @property
     def uid(self) -> int:
         return self._id
@@ -54,6 +60,8 @@ class _User(_Identity, metaclass=ABCMeta):
 
 class _Group(_Identity, metaclass=ABCMeta):
     """ Abstract base class for group identities """
+    __slots__ = ()
+
     @property
     def gid(self) -> int:
         return self._id
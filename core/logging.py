@@ -17,10 +17,12 @@ You should have received a copy of the GNU General Public License along
 with this program. If not, see https://www.gnu.org/licenses/
 """
 
+from __future__ import annotations
+
 import logging
 import sys
 from enum import Enum
-from functools import partial
+from functools import cached_property, partial
 from getpass import getuser
 from traceback import print_tb
 from types import TracebackType
@@ -54,6 +56,72 @@ def _equal_stream_handlers(lhs: logging.StreamHandler,
         and lhs.formatter == rhs.formatter
 
 
+class _LogWrapper:
+    """ End-user logging functions exposed as log.* """
+    _parent: _LoggableMixin
+
+    def __init__(self, parent: _LoggableMixin) -> None:
+        self._parent = parent
+
+    def __call__(self, message: str,
+                 level: Level = Level.Info, *args: T.Any) -> None:
+        """
+        Log a message at an optional level
+
+        NOTE Any additional arguments are %-formatted into the
+        message by the logger, only if it's actually emitted
+        """
+        self._parent.logger.log(level.value, message, *args)
+
+    # NOTE The convenience aliases pass their level's value straight to
+    # the logger, rather than going through the Level enumeration
+    def debug(self, message: str, *args: T.Any) -> None:
+        # Convenience alias
+        self._parent.logger.log(logging.DEBUG, message, *args)
+
+    def info(self, message: str, *args: T.Any) -> None:
+        # Convenience alias
+        self._parent.logger.log(logging.INFO, message, *args)
+
+    def warning(self, message: str, *args: T.Any) -> None:
+        # Convenience alias
+        self._parent.logger.log(logging.WARNING, message, *args)
+
+    def error(self, message: str, *args: T.Any) -> None:
+        # Convenience alias
+        self._parent.logger.log(logging.ERROR, message, *args)
+
+    def critical(self, message: str, *args: T.Any) -> None:
+        # Convenience alias
+        self._parent.logger.log(logging.CRITICAL, message, *args)
+
+    @property
+    def _streams(self) -> T.Iterator[logging.StreamHandler]:
+        """ Iterator of StreamHandlers on the logger """
+        yield from filter(lambda h: isinstance(h, logging.StreamHandler), self._parent.logger.handlers)
+
+    def _to_stream(self, handler: logging.StreamHandler,
+                   formatter: T.Optional[logging.Formatter] = None, level: T.Optional[Level] = None) -> None:
+        """ Add a new stream handler to the logger """
+        handler.setFormatter(formatter or self._parent._formatter)
+        handler.setLevel((level or self._parent._level).value)
+
+        if not any(_equal_stream_handlers(handler, stream)
+                   for stream in self._streams):
+            self._parent.logger.addHandler(handler)
+
+    def to_tty(self, formatter: T.Optional[logging.Formatter]
+               = None, level: T.Optional[Level] = None) -> None:
+        # Convenience alias
+        self._to_stream(logging.StreamHandler(), formatter, level)
+
+    def to_file(self, filename: T.Path,
+                formatter: T.Optional[logging.Formatter] = None, level: T.Optional[Level] = None) -> None:
+        # Convenience alias
+        self._to_stream(logging.FileHandler(
+            filename), formatter, level)
+
+
 class _LoggableMixin:
     """ Base mixin class for logging interface """
     # NOTE The following can be either class or instance variables
@@ -68,69 +136,21 @@ class _LoggableMixin:
     @property
     def logger(self) -> logging.Logger:
         # NOTE setLevel is called explicitly on each invocation to avoid
-        # having downstream classes call it in their constructors
+        # having downstream classes call it in their constructors; it's
+        # only called when the level differs, as it clears the level
+        # cache of every logger
         logger = logging.getLogger(self._logger)
-        logger.setLevel(self._level.value)
+        if logger.level != (level := self._level.value):
+            logger.setLevel(level)
+
         return logger
 
-    @property
-    def log(self) -> object:
+    @cached_property
+    def log(self) -> _LogWrapper:
         """ End-user logging functions exposed as log.* """
-        parent = self
-
-        class _wrapper:
-            def __call__(self, message: str,
-                         level: Level = Level.Info) -> None:
-                """ Log a message at an optional level """
-                parent.logger.log(level.value, message)
-
-            def debug(self, message: str) -> None:
-                # Convenience alias
-                self(message, Level.Debug)
-
-            def info(self, message: str) -> None:
-                # Convenience alias
-                self(message, Level.Info)
-
-            def warning(self, message: str) -> None:
-                # Convenience alias
-                self(message, Level.Warning)
-
-            def error(self, message: str) -> None:
-                # Convenience alias
-                self(message, Level.Error)
-
-            def critical(self, message: str) -> None:
-                # Convenience alias
-                self(message, Level.Critical)
-
-            @property
-            def _streams(self) -> T.Iterator[logging.StreamHandler]:
-                """ Iterator of StreamHandlers on the logger """
-                yield from filter(lambda h: isinstance(h, logging.StreamHandler), parent.logger.handlers)
-
-            def _to_stream(self, handler: logging.StreamHandler,
-                           formatter: T.Optional[logging.Formatter] = None, level: T.Optional[Level] = None) -> None:
-                """ Add a new stream handler to the logger """
-                handler.setFormatter(formatter or parent._formatter)
-                handler.setLevel((level or parent._level).value)
-
-                if not any(_equal_stream_handlers(handler, stream)
-                           for stream in self._streams):
-                    parent.logger.addHandler(handler)
-
-            def to_tty(self, formatter: T.Optional[logging.Formatter]
-                       = None, level: T.Optional[Level] = None) -> None:
-                # Convenience alias
-                self._to_stream(logging.StreamHandler(), formatter, level)
-
-            def to_file(self, filename: T.Path,
-                        formatter: T.Optional[logging.Formatter] = None, level: T.Optional[Level] = None) -> None:
-                # Convenience alias
-                self._to_stream(logging.FileHandler(
-                    filename), formatter, level)
-
-        return _wrapper()
+        # NOTE The wrapper defers to its parent for the logger on every
+        # call, so it's built once per instance
+        return _LogWrapper(self)
 
 
 def _set_exception_handler(loggable: T.Type[_LoggableMixin]) -> None:
@@ -18,17 +18,23 @@ with this program. If not, see https://www.gnu.org/licenses/
 """
 
 import os
-from base64 import b64encode, b64decode
+from binascii import a2b_base64, b2a_base64
 from contextlib import ContextDecorator
 from dataclasses import dataclass
 from math import ceil, log10
 from functools import singledispatch
+from threading import RLock
 
 from . import typing as T
 
 
 _ALT_CHARS = b"+_"  # instead of "+/"
 
+# NOTE base64.b64encode and b64decode build these translation tables on
+# every call; we build them once and go straight to binascii instead
+_TO_ALT = bytes.maketrans(b"+/", _ALT_CHARS)
+_FROM_ALT = bytes.maketrans(_ALT_CHARS, b"+/")
+
 
 @singledispatch
 def _b64encode(data: T.Stringable) -> T.NoReturn:
@@ -42,7 +48,7 @@ def _(data: str) -> str:
 
 @_b64encode.register
 def _(data: bytes) -> str:
-    return b64encode(data, altchars=_ALT_CHARS).decode()
+    return b2a_base64(data, newline=False).translate(_TO_ALT).decode()
 
 
 @singledispatch
@@ -57,7 +63,7 @@ def _(data: str) -> bytes:
 
 @_b64decode.register
 def _(data: bytes) -> bytes:
-    return b64decode(data, altchars=_ALT_CHARS)
+    return a2b_base64(data.translate(_FROM_ALT))
 
 
 class base64(T.SimpleNamespace):
@@ -71,13 +77,19 @@ class umask(T.ContextManager[int], ContextDecorator):
     """ umask context manager/decorator """
     umask: int
 
+    # NOTE The umask is process-wide, so concurrent threads mustn't
+    # interleave setting and resetting it; they're serialised instead
+    _lock: T.ClassVar[RLock] = RLock()
+
     def __enter__(self) -> None:
         # Set the umask and preserve the displaced value
+        umask._lock.acquire()
         self.umask = os.umask(self.umask)
 
     def __exit__(self, *exc) -> bool:
         # Reset the umask
         self.umask = os.umask(self.umask)
+        umask._lock.release()
         return False
 
 
@@ -71,6 +71,7 @@ class TestIDM(unittest.TestCase):
 
         self.assertIsInstance(user, LDAPUser)
         self.assertEqual(user.uid, 123)
+        self.assertFalse(hasattr(user, "__dict__"))
 
         # Check laziness; i.e., these attributes are placeholders...
         self.assertIsNone(user._name)
@@ -96,6 +97,7 @@ class TestIDM(unittest.TestCase):
 
         self.assertIsInstance(group, LDAPGroup)
         self.assertEqual(group.gid, 123)
+        self.assertFalse(hasattr(group, "__dict__"))
 
         with patch.multiple("pwd", getpwnam=_DUMMY_PWNAM, getpwuid=_DUMMY_PWUID), \
                 patch("grp.getgrgid", new=_DUMMY_GRGID):
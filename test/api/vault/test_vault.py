@@ -19,13 +19,14 @@ You should have received a copy of the GNU General Public License along
 with this program. If not, see https://www.gnu.org/licenses/
 """
 
+import errno
 import os
 import shutil
 import stat
 import unittest
 from tempfile import TemporaryDirectory
 from test.common import DummyIDM
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 from api.vault import Branch, Vault
 from api.vault.file import VaultExc, VaultFile
@@ -119,6 +120,18 @@ class TestVaultFile(unittest.TestCase):
         self.assertRaises(exception.NotRegularFile, VaultFile,
                           self.vault, Branch.Keep, self.child_dir_one)
 
+    def test_constructor_nonexistent(self):
+        self.assertRaises(exception.DoesNotExist, VaultFile,
+                          self.vault, Branch.Keep, self.child_dir_one / "nonexistent")
+
+        for error, expected in (errno.ELOOP, exception.DoesNotExist), \
+                               (errno.EACCES, PermissionError):
+            # NOTE Path.resolve also stats, so it's bypassed
+            with patch.object(T.Path, "resolve", lambda path: path), \
+                    patch.object(T.Path, "stat", side_effect=OSError(error, os.strerror(error))):
+                self.assertRaises(expected, VaultFile,
+                                  self.vault, Branch.Keep, self.tmp_file_a)
+
     def test_can_add_not_regular_file(self):
         """
         We shouldn't be able to add a file that isn't regular.
@@ -309,6 +322,7 @@ class TestVault(unittest.TestCase):
                          T.Path("parent_dir/child_dir_one/.vault"))
         # Test Ownerships
         self.assertEqual(next(self.vault.owners), 1)
+        self.assertEqual(list(self.vault.owners), list(self.vault.owners))
         self.assertEqual(self.vault.group, self.child_dir_one.stat().st_gid)
         # Test Branch Creation
         self.assertTrue(os.path.isdir(
@@ -371,6 +385,22 @@ class TestVault(unittest.TestCase):
                 fname.chmod(0o777)
         self.vault.add(Branch.Limbo, self.tmp_file_d)
 
+    def test_preexisting_long(self):
+        # A key split over directories must still be found when it's
+        # looked up from a different branch
+        long_subdirectory = self.child_dir_one / ("long/" * 60)
+        long_subdirectory.mkdir(parents=True)
+        long_subdirectory.chmod(0o770)
+        self.tmp_file_d = long_subdirectory / "d"
+        self.tmp_file_d.touch()
+        self.tmp_file_d.chmod(0o660)
+
+        self.vault.add(Branch.Keep, self.tmp_file_d)
+        found = self.vault.file(Branch.Archive, self.tmp_file_d)
+        self.assertTrue(found.exists)
+        self.assertEqual(found.branch, Branch.Keep)
+        self.assertEqual(found.source, self.tmp_file_d.resolve())
+
     def test_add_incorrect_parent_perms(self):
         # Add child_dir_one/tmp_file_b to vault and check whether hard link
         # exists at desired location.
@@ -473,6 +503,19 @@ class TestVault(unittest.TestCase):
         self.assertEqual(next(self.vault.list(Branch.Keep)),
                          (self.tmp_file_a, vault_file_path))
 
+    def test_scan(self):
+        self.vault.add(Branch.Keep, self.tmp_file_a)
+        path, entry = next(self.vault.scan(Branch.Keep))
+        self.assertEqual(path, self.tmp_file_a)
+        self.assertEqual(entry.stat().st_ino, self.tmp_file_a.stat().st_ino)
+
+    def test_branch(self):
+        self.assertIsNone(self.vault.branch(self.tmp_file_a))
+
+        self.vault.add(Branch.Archive, self.tmp_file_a)
+        self.assertEqual(self.vault.branch(self.tmp_file_a), Branch.Archive)
+        self.assertIsNone(self.vault.branch(self.tmp_file_b))
+
     def test_remove_existing_file(self):
         self.vault.add(Branch.Keep, self.tmp_file_a)
         inode_no = self.tmp_file_a.stat().st_ino
@@ -19,15 +19,20 @@ You should have received a copy of the GNU General Public License along
 with this program. If not, see https://www.gnu.org/licenses/
 """
 
+import gzip
+import os
 import unittest
 from tempfile import TemporaryDirectory
 from test.common import DummyIDM
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
+from api.persistence import models
 from api.vault import Branch, Vault
 from bin.common import Executable, generate_config
-from bin.sandman.walk import FilesystemWalker, InvalidVaultBases
-from core import typing as T
+from bin.sandman.walk import (File, FilesystemWalker, InvalidVaultBases,
+                              _digest, mpistatWalker)
+from core import time, typing as T
+from core.utils import base64
 from core.vault import exception as VaultExc
 
 config, _ = generate_config(Executable.SANDMAN)
@@ -157,6 +162,225 @@ class TestFileSystemWalker(unittest.TestCase):
         self.assertFalse(isinstance(
             files[self.file_two], VaultExc.VaultCorruption))
 
+    # Behavior: A file constructed from a directory entry has the same
+    # stat information as one constructed from the filesystem
+    def test_from_dir_entry(self):
+        with os.scandir(self.parent) as entries:
+            entry, = (e for e in entries if e.name == "file1")
+            walked = File.FromDirEntry(entry, idm=self._dummy_idm)
+
+        expected = File.FromFS(self.file_one, idm=self._dummy_idm)
+        self.assertEqual(walked.path, self.file_one)
+        self.assertEqual(walked.to_persistence(), expected.to_persistence())
+
+    # Behavior: Files are only restat'ed when their stat data is stale
+    def test_restat_when_stale(self):
+        fresh = File.FromFS(self.file_one, idm=self._dummy_idm)
+        stale = File.FromStat(self.file_one, self.file_one.stat(),
+                              time.epoch(0), idm=self._dummy_idm)
+
+        with patch("bin.sandman.walk.models.File.FromFS",
+                   wraps=models.File.FromFS) as from_fs:
+            _ = fresh.age
+            from_fs.assert_not_called()
+
+            _ = stale.age
+            _ = stale.age
+            from_fs.assert_called_once()
+
+            fresh.restat(force=True)
+            self.assertEqual(from_fs.call_count, 2)
+
+
+class TestMpistatWalker(unittest.TestCase):
+
+    def setUp(self):
+        """
+        The following tests will emulate the following directory structure
+            +- parent/
+                +- .vault
+                +- some/
+                |  +- file2
+                +- file1
+            +- outside
+        """
+        self._dummy_idm = DummyIDM(config)
+
+        self._tmp = TemporaryDirectory()
+        self.tmp = T.Path(self._tmp.name).resolve()
+        self.parent = path = self.tmp / "parent"
+        self.some = path / "some"
+        self.some.mkdir(parents=True, exist_ok=True)
+        self.file_one = path / "file1"
+        self.file_two = self.some / "file2"
+        self.outside = self.tmp / "outside"
+        for f in self.file_one, self.file_two, self.outside:
+            f.touch()
+            f.chmod(0o660)
+
+        self.parent.chmod(0o770)
+        self.some.chmod(0o770)
+        Vault._find_root = MagicMock(return_value=self.parent)
+        self.vault = Vault(relative_to=self.file_one, idm=self._dummy_idm)
+
+        self.mpistat = self.tmp / "mpistat.gz"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write_mpistat(self, *records: T.Tuple[T.Path, str]):
+        with gzip.open(self.mpistat, mode="wt") as mpistat:
+            for path, mode in records:
+                stat = path.stat()
+                fields = [base64.encode(path), stat.st_size, os.getuid(),
+                          os.getgid(), int(stat.st_atime),
+                          int(stat.st_mtime), int(stat.st_ctime), mode,
+                          stat.st_ino, stat.st_nlink, stat.st_dev]
+                print(*fields, sep="\t", file=mpistat)
+
+    def _walk(self, cache=None):
+        with patch.object(mpistatWalker, "_fetch_vaults",
+                          return_value={self.vault}):
+            walker = mpistatWalker(self.mpistat, self.parent, cache=cache)
+
+        return {file.path: status for _, file, status in walker.files()}
+
+    # Behavior: Only regular files within the vaults are yielded, with
+    # their respective statuses
+    def test_basic_case(self):
+        self.vault.add(Branch.Keep, self.file_one)
+        self._write_mpistat((self.file_one, "f"),
+                            (self.file_two, "f"),
+                            (self.some, "d"),
+                            (self.outside, "f"))
+
+        files = self._walk()
+        self.assertEqual(files, {self.file_one: Branch.Keep,
+                                 self.file_two: None})
+
+    # Behavior: The walk is the same when decompressing out-of-process
+    # (n.b., gzip shares the command line interface we use from pigz)
+    def test_decompress_out_of_process(self):
+        self._write_mpistat((self.file_one, "f"), (self.file_two, "f"))
+
+        with patch("bin.sandman.walk.shutil.which", return_value="gzip"):
+            files = self._walk()
+
+        self.assertEqual(files, {self.file_one: None, self.file_two: None})
+
+    # Behavior: Decompression failures are raised
+    def test_decompress_failure(self):
+        self.mpistat.write_bytes(b"not gzipped")
+
+        for decompressor in None, "gzip":
+            with patch("bin.sandman.walk.shutil.which", return_value=decompressor):
+                self.assertRaises(OSError, self._walk)
+
+    # Behavior: Relevant records are cached between walks of the same
+    # mpistat output, but not after a failed walk, and superseded
+    # caches are removed
+    def test_cache(self):
+        cache = self.tmp / "cache"
+        self._write_mpistat((self.file_one, "f"), (self.outside, "f"))
+
+        with patch("bin.sandman.walk._decompress", side_effect=OSError):
+            self.assertRaises(OSError, self._walk, cache)
+        self.assertEqual(list(cache.iterdir()), [])
+
+        expected = {self.file_one: None}
+        self.assertEqual(self._walk(cache), expected)
+        cached, = cache.iterdir()
+        self.assertEqual(len(cached.read_bytes().splitlines()), 1)
+
+        # Cache hit: The mpistat output isn't read
+        with patch("bin.sandman.walk._decompress", side_effect=OSError):
+            self.assertEqual(self._walk(cache), expected)
+
+        # Cache miss: The mpistat output has changed
+        self._write_mpistat((self.file_one, "f"), (self.file_two, "f"))
+        os.utime(self.mpistat, ns=(0, 0))
+        self.assertEqual(self._walk(cache), {self.file_one: None,
+                                             self.file_two: None})
+
+        # Only the latest cache is retained
+        latest, = cache.iterdir()
+        self.assertNotEqual(latest, cached)
+        self.assertEqual(len(latest.read_bytes().splitlines()), 2)
+
+    # Behavior: Caches for other sets of vaults, or that aren't caches,
+    # in the same directory are retained
+    def test_cache_shared(self):
+        cache = self.tmp / "cache"
+        cache.mkdir()
+        other_vaults = cache / f"mpistat-{_digest('/elsewhere/')}-{_digest('other')}.records"
+        other_vaults.touch()
+        unrelated = cache / "unrelated.mpistat"
+        unrelated.touch()
+
+        self._write_mpistat((self.file_one, "f"))
+        self._walk(cache)
+
+        self._write_mpistat((self.file_one, "f"), (self.file_two, "f"))
+        os.utime(self.mpistat, ns=(0, 0))
+        self._walk(cache)
+
+        self.assertEqual(len(list(cache.iterdir())), 3)
+        self.assertTrue(other_vaults.exists())
+        self.assertTrue(unrelated.exists())
+
+    # Behavior: Batched walks cover the same files, in bounded batches
+    def test_file_batches(self):
+        self._write_mpistat((self.file_one, "f"), (self.file_two, "f"))
+
+        with patch.object(mpistatWalker, "_fetch_vaults",
+                          return_value={self.vault}):
+            walker = mpistatWalker(self.mpistat, self.parent)
+            batches = list(walker.file_batches(1))
+            self.assertRaises(ValueError, next, walker.file_batches(0))
+
+        self.assertEqual([len(batch) for batch in batches], [1, 1])
+        self.assertEqual({file.path for batch in batches for _, file, _ in batch},
+                         {self.file_one, self.file_two})
+
+    # Behavior: Malformed records are skipped
+    def test_malformed_records(self):
+        self._write_mpistat((self.file_one, "f"))
+        with gzip.open(self.mpistat, mode="at") as mpistat:
+            print(file=mpistat)
+            print(base64.encode(self.file_two), "truncated",
+                  sep="\t", file=mpistat)
+
+        files = self._walk()
+        self.assertEqual(files, {self.file_one: None})
+
+    # Behavior: Files are matched regardless of whether the vault root
+    # ends on a base64 group boundary
+    def test_prefix_alignment(self):
+        for padding in range(3):
+            root = self.tmp / f"vault{'x' * padding}"
+            (in_vault := root / "file").parent.mkdir()
+            in_vault.touch()
+            in_vault.chmod(0o660)
+            root.chmod(0o770)
+
+            Vault._find_root = MagicMock(return_value=root)
+            self.vault = Vault(relative_to=in_vault, idm=self._dummy_idm)
+            self._write_mpistat((in_vault, "f"), (self.file_one, "f"))
+
+            files = self._walk()
+            self.assertEqual(files, {in_vault: None})
+
+    # Behavior: A sibling directory sharing the vault's base64 prefix
+    # is not matched
+    def test_sibling_prefix(self):
+        sibling = self.tmp / "parent2"
+        sibling.mkdir()
+        (sibling_file := sibling / "file").touch()
+        self._write_mpistat((sibling_file, "f"), (self.file_one, "f"))
+
+        files = self._walk()
+        self.assertEqual(files, {self.file_one: None})
+
 
 class TestWontRunSandman(unittest.TestCase):
     def setUp(self) -> None:
@@ -21,7 +21,9 @@ with this program. If not, see https://www.gnu.org/licenses/
 import argparse
 from core import typing as T
 from api.vault import Branch
-from bin.vault import main, ViewContext
+from bin.vault import add, main, untrack, ViewContext, _threads
+from core.file import exception as FileExc
+from core.vault import exception as VaultExc
 import unittest
 from unittest import mock
 from unittest.mock import call, mock_open
@@ -145,75 +147,67 @@ class TestMain(unittest.TestCase):
         mock_remove.assert_not_called()
 
     @mock.patch('bin.vault.untrack')
-    @mock.patch('bin.vault.view')
+    @mock.patch('bin.vault.view_many')
     def test_archive_view_relative_default(self, mock_view, mock_remove):
         main(["__init__", "archive", "--view"])
-        calls = [call(Branch.Archive, ViewContext.All, False),
-                 call(Branch.Stash, ViewContext.All, False)]
-        mock_view.assert_has_calls(calls)
+        mock_view.assert_called_once_with(
+            [Branch.Archive, Branch.Stash], ViewContext.All, False)
         mock_remove.assert_not_called()
 
     @mock.patch('bin.vault.untrack')
-    @mock.patch('bin.vault.view')
+    @mock.patch('bin.vault.view_many')
     def test_archive_view_absolute_default(self, mock_view, mock_remove):
         main(["__init__", "archive", "--view", "--absolute"])
-        calls = [call(Branch.Archive, ViewContext.All, True),
-                 call(Branch.Stash, ViewContext.All, True)]
-        mock_view.assert_has_calls(calls)
+        mock_view.assert_called_once_with(
+            [Branch.Archive, Branch.Stash], ViewContext.All, True)
         mock_remove.assert_not_called()
 
     @mock.patch('bin.vault.untrack')
-    @mock.patch('bin.vault.view')
+    @mock.patch('bin.vault.view_many')
     def test_archive_view_relative_all(self, mock_view, mock_remove):
         main(["__init__", "archive", "--view", "all"])
-        calls = [call(Branch.Archive, ViewContext.All, False),
-                 call(Branch.Stash, ViewContext.All, False)]
-        mock_view.assert_has_calls(calls)
+        mock_view.assert_called_once_with(
+            [Branch.Archive, Branch.Stash], ViewContext.All, False)
         mock_remove.assert_not_called()
 
     @mock.patch('bin.vault.untrack')
-    @mock.patch('bin.vault.view')
+    @mock.patch('bin.vault.view_many')
     def test_archive_view_absolute_all(self, mock_view, mock_remove):
         main(["__init__", "archive", "--view", "all", "--absolute"])
-        calls = [call(Branch.Archive, ViewContext.All, True),
-                 call(Branch.Stash, ViewContext.All, True)]
-        mock_view.assert_has_calls(calls)
+        mock_view.assert_called_once_with(
+            [Branch.Archive, Branch.Stash], ViewContext.All, True)
         mock_remove.assert_not_called()
 
     @mock.patch('bin.vault.untrack')
-    @mock.patch('bin.vault.view')
+    @mock.patch('bin.vault.view_many')
     def test_archive_view_relative_here(self, mock_view, mock_remove):
         main(["__init__", "archive", "--view", "here"])
-        calls = [call(Branch.Archive, ViewContext.Here, False),
-                 call(Branch.Stash, ViewContext.Here, False)]
-        mock_view.assert_has_calls(calls)
+        mock_view.assert_called_once_with(
+            [Branch.Archive, Branch.Stash], ViewContext.Here, False)
         mock_remove.assert_not_called()
 
     @mock.patch('bin.vault.untrack')
-    @mock.patch('bin.vault.view')
+    @mock.patch('bin.vault.view_many')
     def test_archive_view_absolute_here(self, mock_view, mock_remove):
         main(["__init__", "archive", "--view", "here", "--absolute"])
-        calls = [call(Branch.Archive, ViewContext.Here, True),
-                 call(Branch.Stash, ViewContext.Here, True)]
-        mock_view.assert_has_calls(calls)
+        mock_view.assert_called_once_with(
+            [Branch.Archive, Branch.Stash], ViewContext.Here, True)
         mock_remove.assert_not_called()
 
     @mock.patch('bin.vault.untrack')
-    @mock.patch('bin.vault.view')
+    @mock.patch('bin.vault.view_many')
     def test_archive_view_relative_mine(self, mock_view, mock_remove):
         main(["__init__", "archive", "--view", "mine"])
-        calls = [call(Branch.Archive, ViewContext.Mine, False),
-                 call(Branch.Stash, ViewContext.Mine, False)]
-        mock_view.assert_has_calls(calls)
+        mock_view.assert_called_once_with(
+            [Branch.Archive, Branch.Stash], ViewContext.Mine, False)
         mock_remove.assert_not_called()
 
     @mock.patch('bin.vault.untrack')
-    @mock.patch('bin.vault.view')
+    @mock.patch('bin.vault.view_many')
     def test_archive_view_absolute_mine(self, mock_view, mock_remove):
         main(["__init__", "archive", "--view", "mine", "--absolute"])
-        calls = [call(Branch.Archive, ViewContext.Mine, True),
-                 call(Branch.Stash, ViewContext.Mine, True)]
-        mock_view.assert_has_calls(calls)
+        mock_view.assert_called_once_with(
+            [Branch.Archive, Branch.Stash], ViewContext.Mine, True)
         mock_remove.assert_not_called()
 
     @mock.patch('bin.vault.untrack')
@@ -354,3 +348,126 @@ class TestMain(unittest.TestCase):
         args = mock_untrack.call_args.args
         files = list(args[0])
         self.assertEqual(files, [T.Path("/file1"), T.Path("/file2")])
+
+
+class TestVaultCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self._tmp = TemporaryDirectory()
+        self.path = path = T.Path(self._tmp.name)
+        for directory in "foo", "bar":
+            (path / directory).mkdir()
+
+        self.files = [path / "foo" / "file1", path / "foo" / "file2",
+                      path / "bar" / "file3"]
+        for f in self.files:
+            f.touch()
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    @mock.patch('bin.vault.Vault._find_root', return_value=T.Path("/root"))
+    @mock.patch('bin.vault._create_vault')
+    def test_add(self, mock_create_vault, mock_find_root):
+        # Files in different directories of the same vault
+        add(Branch.Keep, self.files)
+        self.assertEqual(mock_find_root.call_count, 2)
+        self.assertEqual(mock_create_vault.call_count, 1)
+        self.assertEqual(mock_create_vault.return_value.add.call_count, 3)
+
+    @mock.patch('bin.vault.Vault._find_root', side_effect=lambda f: f.parent)
+    @mock.patch('bin.vault._create_vault')
+    def test_add_different_vaults(self, mock_create_vault, mock_find_root):
+        add(Branch.Keep, self.files)
+        self.assertEqual(mock_create_vault.call_count, 2)
+        self.assertEqual(mock_create_vault.return_value.add.call_count, 3)
+
+    @mock.patch('bin.vault._add')
+    @mock.patch('bin.vault._create_vault')
+    def test_add_hardlinks(self, mock_create_vault, mock_add):
+        hardlink = self.path / "bar" / "hardlink"
+        os.link(self.files[0], hardlink)
+
+        add(Branch.Keep, [*self.files, hardlink])
+        batches = sorted(batch for _, _, batch in
+                         (c.args for c in mock_add.call_args_list))
+        self.assertEqual(batches, sorted([[self.files[0], hardlink],
+                                          [self.files[1]], [self.files[2]]]))
+
+    @mock.patch('bin.vault.Vault._find_root', side_effect=lambda f: f.parent)
+    @mock.patch('bin.vault._create_vault')
+    def test_add_hardlinks_different_vaults(self, mock_create_vault, mock_find_root):
+        vaults = {}
+        mock_create_vault.side_effect = \
+            lambda f, _idm: vaults.setdefault(f.parent, mock.MagicMock(root=f.parent))
+
+        hardlink = self.path / "bar" / "hardlink"
+        os.link(self.files[0], hardlink)
+
+        add(Branch.Keep, [self.files[0], hardlink])
+        vaults[self.path / "foo"].add.assert_called_once_with(
+            Branch.Keep, self.files[0])
+        vaults[self.path / "bar"].add.assert_called_once_with(
+            Branch.Keep, hardlink)
+
+    @mock.patch('bin.vault.log')
+    @mock.patch('bin.vault.Vault._find_root', return_value=T.Path("/root"))
+    @mock.patch('bin.vault._create_vault')
+    def test_add_failures(self, mock_create_vault, mock_find_root, mock_log):
+        def _add(branch, f):
+            raise VaultExc.PermissionDenied(f)
+
+        mock_create_vault.return_value.add.side_effect = _add
+        add(Branch.Keep, self.files)
+        self.assertEqual(mock_log.error.call_args_list,
+                         [call("Permission denied: %s", mock.ANY)] * 3)
+        self.assertEqual([c.args[1].args[0] for c in mock_log.error.call_args_list],
+                         self.files)
+
+    @mock.patch('bin.vault.log')
+    @mock.patch('bin.vault.Vault._find_root', return_value=T.Path("/root"))
+    @mock.patch('bin.vault._create_vault')
+    def test_add_unexpected_failure(self, mock_create_vault, mock_find_root, mock_log):
+        def _add(branch, f):
+            if f == self.files[0]:
+                raise FileExc.UnactionableFile(f)
+
+            raise VaultExc.PermissionDenied(f)
+
+        mock_create_vault.return_value.add.side_effect = _add
+        self.assertRaises(FileExc.UnactionableFile, add, Branch.Keep, self.files)
+
+        # The expected failures are still all logged
+        self.assertEqual([c.args[1].args[0] for c in mock_log.error.call_args_list],
+                         self.files[1:])
+
+    @mock.patch('bin.vault._ADD_CHUNK', 1)
+    @mock.patch('bin.vault.Vault._find_root', return_value=T.Path("/root"))
+    @mock.patch('bin.vault._create_vault')
+    def test_add_chunks(self, mock_create_vault, mock_find_root):
+        hardlink = self.path / "bar" / "hardlink"
+        os.link(self.files[0], hardlink)
+
+        add(Branch.Keep, iter([*self.files, hardlink]))
+        self.assertEqual(mock_create_vault.return_value.add.call_args_list,
+                         [call(Branch.Keep, f) for f in [*self.files, hardlink]])
+
+    @mock.patch('bin.vault.Vault._find_root', return_value=T.Path("/root"))
+    @mock.patch('bin.vault._create_vault')
+    def test_untrack(self, mock_create_vault, mock_find_root):
+        untrack(self.files)
+        self.assertEqual(mock_create_vault.call_count, 1)
+        self.assertEqual(mock_create_vault.return_value.remove.call_count, 3)
+
+
+class TestThreads(unittest.TestCase):
+
+    @mock.patch('bin.vault.log')
+    def test_threads(self, mock_log):
+        for value, expected in (None, 8), ("4", 4), ("foo", 8), ("0", 8), ("-1", 8):
+            environment = {} if value is None else {"VAULT_ADD_THREADS": value}
+            with mock.patch.dict(os.environ, environment, clear=True):
+                self.assertEqual(_threads("VAULT_ADD_THREADS"), expected)
+
+        self.assertEqual(mock_log.warning.call_count, 3)
+
@@ -19,6 +19,7 @@ You should have received a copy of the GNU General Public License along
 with this program. If not, see https://www.gnu.org/licenses/
 """
 
+import io
 import os
 import unittest
 from tempfile import TemporaryDirectory
@@ -29,11 +30,17 @@ from api.vault import Branch, Vault
 from bin.common import generate_config, Executable
 from bin.vault import ViewContext, recover, view
 from bin.vault.recover import (derelativise, exception,
-                               move_with_path_safety_checks, relativise)
-from core import typing as T
+                               move_with_path_safety_checks, relativise,
+                               relativiser)
+from core import file, typing as T
 
 config, _ = generate_config(Executable.VAULT)
 
+
+def _stdout():
+    return io.TextIOWrapper(io.BytesIO())
+
+
 class TestVaultRelativeToWorkDirRelative(unittest.TestCase):
     """
     The following tests will emulate the following directory structure
@@ -62,6 +69,16 @@ class TestVaultRelativeToWorkDirRelative(unittest.TestCase):
         self.assertEqual(expected, work_dir_rel)
 
 
+    def test_relativiser(self):
+        work_dir = T.Path("/this/is/my/path")
+        relativise_many = relativiser(work_dir)
+        for vault_relative_path in T.Path("/this/is/my/path/file1"), \
+                T.Path("/this/is/my/path/some/file2"), \
+                T.Path("/this/is/my/file3"), T.Path("/this/is/my/pathname"):
+            self.assertEqual(relativise_many(vault_relative_path),
+                             relativise(vault_relative_path, work_dir))
+
+
 class TestWorkDirRelativeToVaultRelative(unittest.TestCase):
 
     def test_child_to_work_dir(self):
@@ -83,6 +100,25 @@ class TestWorkDirRelativeToVaultRelative(unittest.TestCase):
         self.assertEqual(expected, vault_relative_path)
 
 
+    def test_symlinks(self):
+        with TemporaryDirectory() as tmp:
+            vault_path = T.Path(tmp).resolve()
+            (vault_path / "real").mkdir()
+            (vault_path / "real" / "file1").touch()
+            (vault_path / "link").symlink_to("real")
+            (vault_path / "real" / "file2").symlink_to("file1")
+
+            for work_dir_rel, expected in [
+                (T.Path("link/file1"), T.Path("real/file1")),
+                (T.Path("link/file2"), T.Path("real/file1")),
+                (T.Path("link/.."), T.Path(".")),
+                (T.Path("link/new"), T.Path("real/new"))
+            ]:
+                vault_relative_path = derelativise(
+                    work_dir_rel, T.Path("."), vault_path)
+                self.assertEqual(expected, vault_relative_path)
+
+
 class TestMovWithPathSafetyChecks(unittest.TestCase):
     _tmp: TemporaryDirectory
     _path: T.Path
@@ -118,6 +154,20 @@ class TestMovWithPathSafetyChecks(unittest.TestCase):
         self.assertRaises(exception.NoParentForDestination,
                           move_with_path_safety_checks, full_source_path, full_dest_path)
 
+    def test_source_checked_first(self):
+        full_source_path = self._path / "new"
+        for full_dest_path in self._path / "new" / "quux", self._path / "foo":
+            self.assertRaises(exception.NoSourceFound,
+                              move_with_path_safety_checks, full_source_path, full_dest_path)
+
+    def test_destination_already_exists(self):
+        full_source_path = self._path / "foo"
+        full_dest_path = self._path / "quux"
+        full_dest_path.touch()
+        self.assertRaises(exception.DestinationAlreadyExists,
+                          move_with_path_safety_checks, full_source_path, full_dest_path)
+        self.assertTrue(os.path.isfile(full_source_path))
+
 
 class TestRecover(unittest.TestCase):
 
@@ -194,6 +244,31 @@ class TestRecover(unittest.TestCase):
         self.assertTrue(os.path.isfile(vault_file_path_three))
         self.assertFalse(os.path.isfile(self.file_three))
 
+    @mock.patch('bin.vault.file.cwd')
+    @mock.patch('bin.vault._create_vault')
+    def test_stops_when_found(self, vault_mock, cwd_mock):
+        for f in self.file_one, self.file_two, self.file_three:
+            self.vault.add(Branch.Limbo, f)
+            f.unlink()
+
+        cwd_mock.return_value = self.some
+        vault_mock.return_value = self.vault
+
+        exhausted = False
+        walk = file.walk
+
+        def _walk(path):
+            nonlocal exhausted
+            yield from walk(path)
+            exhausted = True
+
+        with mock.patch('bin.vault.file.walk', side_effect=_walk):
+            recover([T.Path("../file1"), T.Path("file2"), T.Path("file3")])
+
+        self.assertFalse(exhausted)
+        for f in self.file_one, self.file_two, self.file_three:
+            self.assertTrue(os.path.isfile(f))
+
     @mock.patch('bin.vault.file.cwd')
     @mock.patch('bin.vault._create_vault')
     def test_all_case(self, vault_mock, cwd_mock):
@@ -278,3 +353,35 @@ class TestView(unittest.TestCase):
 
         cwd_mock.return_value = self.parent / "some"
         view(Branch.Limbo, ViewContext.All, False, idm=self._dummy_idm)
+
+    @mock.patch('bin.vault.file.cwd')
+    def test_output(self, cwd_mock):
+        self.vault.add(Branch.Keep, self.file_one)
+        self.vault.add(Branch.Keep, self.file_two)
+        self.vault.add(Branch.Limbo, self.file_three)
+
+        cwd_mock.return_value = self.parent
+        with mock.patch('bin.vault._VIEW_BATCH', 1), \
+             mock.patch('sys.stdout', new_callable=_stdout) as stdout:
+            view(Branch.Keep, ViewContext.All, False, idm=self._dummy_idm)
+            self.assertEqual(sorted(stdout.buffer.getvalue().decode().splitlines()),
+                             ["file1", "some/file2"])
+
+        for context, expected in (ViewContext.Here, ["file1"]), \
+                                 (ViewContext.Mine, ["file1", "some/file2"]):
+            with mock.patch('sys.stdout', new_callable=_stdout) as stdout:
+                view(Branch.Keep, context, False, idm=self._dummy_idm)
+                self.assertEqual(sorted(stdout.buffer.getvalue().decode().splitlines()),
+                                 expected)
+
+        # Text-only streams (i.e., without a binary buffer) are supported
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            view(Branch.Keep, ViewContext.All, False, idm=self._dummy_idm)
+            self.assertEqual(sorted(stdout.getvalue().splitlines()),
+                             ["file1", "some/file2"])
+
+        with mock.patch('sys.stdout', new_callable=_stdout) as stdout:
+            view(Branch.Limbo, ViewContext.All, False, idm=self._dummy_idm)
+            path, time_to_live = stdout.buffer.getvalue().decode().splitlines()[0].split("\t")
+            self.assertEqual(path, "some/file3")
+            self.assertTrue(time_to_live.endswith(" hours"))
@@ -23,6 +23,7 @@ from core import typing as T
 from bin.vault.usage import parse_args
 import unittest
 import os
+from tempfile import TemporaryDirectory
 
 
 class TestUsage(unittest.TestCase):
@@ -50,7 +51,7 @@ class TestUsage(unittest.TestCase):
     def test_keep_extra_files(self):
         args = ["keep", "/file1", "/file2", "/file3", "/file4",
                 "/file5", "/file6", "/file7", "/file8", "/file9", "/file10", "/file11"]
-        self.assertRaises(KeyError, parse_args, args)
+        self.assertRaises(SystemExit, parse_args, args)
 
     def test_archive(self):
         args = parse_args(["archive", "/file1", "/file2"])
@@ -75,7 +76,7 @@ class TestUsage(unittest.TestCase):
     def test_archive_extra_files(self):
         args = ["archive", "/file1", "/file2", "/file3", "/file4",
                 "/file5", "/file6", "/file7", "/file8", "/file9", "/file10", "/file11"]
-        self.assertRaises(KeyError, parse_args, args)
+        self.assertRaises(SystemExit, parse_args, args)
 
     def test_recover(self):
         args = parse_args(["recover", "/file1", "/file2"])
@@ -92,11 +93,11 @@ class TestUsage(unittest.TestCase):
 
     def test_recover_view_all(self):
         args = ["recover", "--all", "--view"]
-        self.assertRaises(KeyError, parse_args, args)
+        self.assertRaises(SystemExit, parse_args, args)
 
     def test_recover_view_all(self):
         args = ["recover", "--view", "--all"]
-        self.assertRaises(KeyError, parse_args, args)
+        self.assertRaises(SystemExit, parse_args, args)
 
     def test_recover_file_view(self):
         args = parse_args(["recover", "/file1", "--view"])
@@ -188,7 +189,17 @@ class TestUsage(unittest.TestCase):
         self.assertRaises(SystemExit, parse_args, args)
 
         args = ["archive", "--stash"]
-        self.assertRaises(KeyError, parse_args, args)
+        self.assertRaises(SystemExit, parse_args, args)
+
+    def test_fofn(self):
+        with TemporaryDirectory() as tmp:
+            fofn = T.Path(tmp, "fofn")
+            fofn.write_bytes(b"/file1\n/file2  \n/file3\n/file\xff")
+
+            args = parse_args(["untrack", "--fofn", str(fofn)])
+            self.assertEqual(list(args.files), [
+                T.Path("/file1"), T.Path("/file2"), T.Path("/file3"),
+                T.Path(os.fsdecode(b"/file\xff"))])
 
     def test_file_exception_fofn(self):
 
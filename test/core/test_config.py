@@ -98,6 +98,10 @@ class TestBaseConfig(unittest.TestCase):
         self.assertEqual(cfg.quux.xyzzy, "hello")
         self.assertEqual(cfg.quux.test.abc, "def")
 
+        # Sub-branches are built once and reused
+        self.assertIs(cfg.quux, cfg.quux)
+        self.assertIs(cfg.quux.test, cfg.quux.test)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -58,6 +58,10 @@ class TestFile(unittest.TestCase):
         hardlink = self._path / "quux"
         self.assertEqual(file.inode_id(tmp_file), file.inode_id(hardlink))
 
+        symlink = self._path / "bar"
+        self.assertEqual(file.inode_id(symlink), symlink.lstat().st_ino)
+        self.assertNotEqual(file.inode_id(symlink), inode_id)
+
     def test_is_regular(self) -> None:
         tmp_file = self._path / "foo"
         symlink = self._path / "bar"
@@ -65,6 +69,37 @@ class TestFile(unittest.TestCase):
         self.assertTrue(file.is_regular(tmp_file))
         self.assertFalse(file.is_regular(T.Path("/")))
         self.assertFalse(file.is_regular(symlink))
+        self.assertFalse(file.is_regular(self._path / "xyzzy"))
+
+    def test_regular_stat(self) -> None:
+        tmp_file = self._path / "foo"
+
+        self.assertEqual(file.regular_stat(tmp_file).st_ino,
+                         tmp_file.stat().st_ino)
+        self.assertIsNone(file.regular_stat(self._path / "bar"))
+        self.assertIsNone(file.regular_stat(self._path / "xyzzy"))
+
+    def test_resolve(self) -> None:
+        (self._path / "dir").mkdir()
+        (self._path / "link").symlink_to("dir")
+
+        for path in self._path / "foo", self._path / "bar", \
+                self._path / "link" / "xyzzy", self._path / "link" / "..", \
+                T.Path("."), T.Path(""):
+            self.assertEqual(file.resolve(path), path.resolve())
+            self.assertEqual(file.resolve(path, is_symlink=path.is_symlink()),
+                             path.resolve())
+
+    def test_walk(self) -> None:
+        subdir = self._path / "sub" / "dir"
+        subdir.mkdir(parents=True)
+        (subdir / "xyzzy").touch()
+        (self._path / "sub" / "link").symlink_to(subdir)
+
+        walked = {T.Path(entry) for entry in file.walk(self._path)}
+        self.assertEqual(walked, {self._path / "foo", self._path / "bar",
+                                  self._path / "quux", subdir / "xyzzy",
+                                  self._path / "sub" / "link"})
 
     def test_hardlinks(self) -> None:
         tmp_file = self._path / "foo"
@@ -99,6 +134,17 @@ class TestFile(unittest.TestCase):
         self.assertEqual(_stat.st_atime, 123)
         self.assertEqual(_stat.st_mtime, 456)
 
+    def test_touch_dir_fd(self) -> None:
+        tmp_file = self._path / "foo"
+
+        dir_fd = os.open(self._path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            file.touch("foo", mtime=time.epoch(456), dir_fd=dir_fd)
+        finally:
+            os.close(dir_fd)
+
+        self.assertEqual(tmp_file.stat().st_mtime, 456)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -75,6 +75,31 @@ class TestLogger(unittest.TestCase):
         _mock_logger.log.assert_called_once_with(
             logging.Level.Debug.value, "Hello")
 
+    def test_lazy_arguments(self):
+        _DummyLogger().log.info("Hello %s", "world")
+        _mock_logger.log.assert_called_once_with(
+            logging.Level.Info.value, "Hello %s", "world")
+
+    def test_cached_wrapper(self):
+        dummy = _DummyLogger()
+        self.assertIs(dummy.log, dummy.log)
+
+        dummy.log.info("Hello")
+        dummy.log.info("World")
+        self.assertEqual(_mock_logger.log.call_count, 2)
+
+    def test_logger_level(self):
+        class _Loggable(logging.base.LoggableMixin):
+            _logger = "test_logger_level"
+            _level = logging.Level.Warning
+
+        with patch.object(logging.logging.Logger, "setLevel",
+                          autospec=True, side_effect=logging.logging.Logger.setLevel) as mock_set_level:
+            logger = _Loggable().logger
+            _Loggable().logger
+            mock_set_level.assert_called_once_with(
+                logger, logging.Level.Warning.value)
+
     @patch("sys.exit")
     def test_unhandled_exception(self, mock_exit):
         logging.utils.set_exception_handler(_DummyLogger)